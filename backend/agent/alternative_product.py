@@ -4,6 +4,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from typing import Optional
 
+from backend.utilities.executor import run_blocking
+
 
 # Matching configuration
 TOP_K_CANDIDATES = 15  # Number of candidates to send to AI
@@ -221,8 +223,8 @@ class ProductMatcher:
             print(f"Searching: {(input_product.get('ItemName') or input_product.get('ItemNm') or '')[:50]}")
             print(f"{'=' * 70}")
 
-        # Step 1: Retrieve candidates
-        candidates = self.db.retrieve_candidates(input_product, top_k=top_k)
+        # Step 1: Retrieve candidates (similarity over all products - off the event loop)
+        candidates = await run_blocking(self.db.retrieve_candidates, input_product, top_k=top_k, process_safe=False)
 
         if verbose:
             print(f"\nTop {min(5, len(candidates))} candidates:")
@@ -298,7 +300,8 @@ class ProductMatcher:
 async def get_alternatives(all_products: list[dict], input_product):
     # Initialize matcher (one time setup)
     print("Initializing matcher...")
-    matcher = ProductMatcher(all_products, )
+    # TF-IDF index of all products is CPU-bound - built in the executor, not on the shared backend loop
+    matcher = await run_blocking(ProductMatcher, all_products, process_safe=False)
 
     # Example 1: Match a single product
     result = await matcher.find_match(input_product, top_k=TOP_K_CANDIDATES)
@@ -1,19 +1,13 @@
 """ This is used to initialize registry of all chains at startup """
 
-from backend.core.binaprojects import BinaProjects
-from backend.core.carrefour import CarrefourParent
-# from backend.core.hazihinam import HaziHinam
-# from backend.core.laibcatalog import LaibCatalog
-from backend.core.publishedprices import PublishedPrices
-from backend.core.shufersal import Shufersal
-from backend.core.super_class import SupermarketChain
+from backend.core.registry import CHAINS
 
 
 def initialize_backend():
     """
     Call this once at app startup.
-    Ensures all supermarket chains subclasses are imported and registered.
+    Chains are registered as metadata in backend.core.registry - their adapter modules
+    (and browser / parsing dependencies) are imported only when a chain is first used.
     """
-    # print("Registered chains:", SupermarketChain.registry)
+    # print("Registered chains:", [c.alias for c in CHAINS])
     pass
-
@@ -1,13 +1,30 @@
 import httpx
 from datetime import datetime, timedelta
+import asyncio
 import json
+import time
+import weakref
 
 from backend.utilities.url_request import url_request
+from backend.utilities.executor import run_blocking
+from backend.utilities.file_catalog import FileCatalog, FileRecord, parse_file_url
 from backend.core.super_class import SupermarketChain
 
 
+# Daily file catalog of each chain - rebuilt when older than INDEX_TTL
+INDEX_TTL = 30 * 60  # Seconds
+INDEX_DAYS = 14  # Days probed back for files
+PROBE_BATCH = 4  # Earlier dates probed at the same time when today and yesterday are empty
+FILE_TYPES = {'prices': 2, 'promo': 3, 'pricefull': 4, 'promofull': 5}
+# Key returned by prices() -> catalog file type
+CATALOG_TYPES = {'prices': 'price', 'promo': 'promo', 'pricefull': 'pricefull', 'promofull': 'promofull'}
+_index_builds = weakref.WeakKeyDictionary()  # event loop -> {chain alias: running catalog build task}
+
+
 class BinaProjects(SupermarketChain):
     abstract = True
+    _catalog = FileCatalog()  # Files of the latest days with files
+    _index_time = None  # time.monotonic() of last build
 
     @classmethod
     async def get_file(cls, file_type: int = 0, store: int = 0, date: str | None = None,
@@ -23,10 +40,6 @@ class BinaProjects(SupermarketChain):
         :param client: Optional pre-configured httpx.AsyncClient.
         :return: JSON dict of relevant files or error message.
         """
-        base_url = await cls.get_url()
-        base_url = base_url[:-9]  # Remove last 9 characters
-        url = f"{base_url}MainIO_Hok.aspx"
-
         # Determine start date
         current_date = (
             datetime.today() if date is None else datetime.strptime(date, "%d/%m/%Y")
@@ -34,36 +47,104 @@ class BinaProjects(SupermarketChain):
 
         # Loop backward until we find data
         today = datetime.today()
-        while current_date > today - timedelta(days=14):
-            date_str = current_date.strftime("%d/%m/%Y")
-            payload = {
-                "WStore": str(store),
-                "WDate": date_str,
-                "WFileType": str(file_type),
-            }
-            headers = {
-                "X-Requested-With": "XMLHttpRequest",
-                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-            }
-            result = await url_request(url, method="POST", payload=payload, headers=headers, client=client)
-
+        while current_date > today - timedelta(days=INDEX_DAYS):
+            result = await cls.list_files(file_type, store, current_date.strftime("%d/%m/%Y"), client=client)
             # Handle response or error
-            if "Error" in result:
-                return result  # Return immediately on HTTP/network error
-
-            try:
-                data = result["response"]
-                json_data = json.loads(data)
-                if json_data:  # non-empty list
-                    return {'response': json_data}
-            except Exception as e:
-                return {"Error": f"Invalid JSON response: {str(e)}"}
+            if "Error" in result or result['response']:
+                return result
 
             # If no file for date, go back one day
             current_date -= timedelta(days=1)
 
         return {"Error": "No files found in the last 14 days."}
 
+    @classmethod
+    async def list_files(cls, file_type: int, store: int | str, date_str: str,
+                         client: httpx.AsyncClient | None = None) -> dict:
+        """ Files of one day (DD/MM/YYYY) - {'response': list of file dicts, empty if none} or error message """
+        base_url = await cls.get_url()
+        base_url = base_url[:-9]  # Remove last 9 characters
+        url = f"{base_url}MainIO_Hok.aspx"
+        payload = {
+            "WStore": str(store),
+            "WDate": date_str,
+            "WFileType": str(file_type),
+        }
+        headers = {
+            "X-Requested-With": "XMLHttpRequest",
+            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        }
+        result = await url_request(url, method="POST", payload=payload, headers=headers, client=client,
+                                   hedge=True)
+
+        # Handle response or error
+        if "Error" in result:
+            return result  # Return immediately on HTTP/network error
+
+        try:
+            # Listing of all stores can be large - decoded in the executor, not on the backend loop
+            return {'response': await run_blocking(json.loads, result["response"]) or []}
+        except Exception as e:
+            return {"Error": f"Invalid JSON response: {str(e)}"}
+
+    @classmethod
+    async def daily_listing(cls) -> list[dict]:
+        """
+        Files of all stores and types (WStore=0, WFileType=0) of the latest days with files.
+        Today and yesterday are listed together (full files of the night may be in either),
+        if both are empty earlier dates are probed PROBE_BATCH at a time.
+        """
+        today = datetime.today()
+        dates = [(today - timedelta(days=d)).strftime("%d/%m/%Y") for d in range(INDEX_DAYS)]
+        batches = [dates[:2]] + [dates[i:i + PROBE_BATCH] for i in range(2, len(dates), PROBE_BATCH)]
+        for batch in batches:
+            results = await asyncio.gather(*(cls.list_files(0, 0, date_str) for date_str in batch))
+            files = [row for result in results for row in result.get('response') or []]
+            if files:
+                return files
+        return []
+
+    @classmethod
+    async def build_catalog(cls) -> FileCatalog:
+        """ Catalog of the files in the daily listing - timestamp from DateFile, type and store from FileNm """
+        base_url = await cls.get_url()
+        return await run_blocking(cls.catalog_from_listing, await cls.daily_listing(), base_url[:-9])
+
+    @classmethod
+    def catalog_from_listing(cls, rows: list[dict], base_url: str) -> FileCatalog:
+        """ Catalog of the listing rows (CPU-bound, run in the executor) """
+        catalog = FileCatalog()
+        for row in rows:
+            record = parse_file_url(row.get('FileNm', ''), cls.alias)
+            if record is None:
+                continue
+            try:
+                timestamp = datetime.strptime(row['DateFile'], "%H:%M %d/%m/%Y")
+            except (KeyError, ValueError):
+                timestamp = record.timestamp
+            catalog.add(FileRecord(timestamp, f"{base_url}Download/{row['FileNm']}", cls.alias,
+                                   record.store, record.file_type))
+        return catalog
+
+    @classmethod
+    async def file_catalog(cls) -> FileCatalog:
+        """
+        Daily file catalog of the chain - rebuilt when older than INDEX_TTL.
+        Concurrent callers on the same event loop wait for one rebuild.
+        """
+        if cls._index_time is None or time.monotonic() - cls._index_time > INDEX_TTL:
+            loop = asyncio.get_running_loop()
+            builds = _index_builds.setdefault(loop, {})
+            task = builds.get(cls.alias)
+            if task is None:
+                task = builds[cls.alias] = loop.create_task(cls.build_catalog())
+                task.add_done_callback(lambda _: builds.pop(cls.alias, None))
+            catalog = await asyncio.shield(task)
+            # A failed rebuild keeps the previous catalog and is not retried before the TTL
+            cls._catalog = catalog if len(catalog) else cls._catalog
+            cls._index_time = time.monotonic()
+        return cls._catalog
+
     @classmethod
     async def latest_file(cls, data: list[dict]) -> dict:
         """ This function gets the latest file in list of dicts of files from binaprojects site """
@@ -95,10 +176,19 @@ class BinaProjects(SupermarketChain):
 
     @classmethod
     async def prices(cls, store_code: int | str):
-        types = {'prices': 2, 'promo': 3, 'pricefull': 4, 'promofull': 5}
+        """ Latest price and promo file urls of the store - from the daily catalog, else listings of the store """
+        catalog = await cls.file_catalog()
+        urls = catalog.latest_urls(store_code, CATALOG_TYPES)
+        if urls['pricefull'] and urls['promofull']:
+            return urls
+
+        # Full file missing in the catalog → listings of the store, only for the missing full types
         try:
-            prices = {}
-            for t, ft in types.items():
+            prices = urls
+            for t in ('pricefull', 'promofull'):
+                if prices[t]:
+                    continue
+                ft = FILE_TYPES[t]
                 # Get links for file type
                 file_links = await cls.get_file(file_type=ft, store=store_code)
                 # From response, get the latest store file
@@ -112,6 +202,21 @@ class BinaProjects(SupermarketChain):
         except Exception as e:
             return {'Error': str(e)}
 
+    @classmethod
+    async def prices_many(cls, store_codes: list[int | str], concurrency: int = 8) -> dict[str, dict | None]:
+        """ Latest files of many stores from the one daily catalog - per store listings only for missing stores """
+        catalog = await cls.file_catalog()
+        results, missing = {}, []
+        for store_code in store_codes:
+            urls = catalog.latest_urls(store_code, CATALOG_TYPES)
+            if urls['pricefull'] and urls['promofull']:
+                results[str(store_code)] = urls
+            else:
+                missing.append(store_code)
+        if missing:
+            results.update(await super().prices_many(missing, concurrency))
+        return results
+
     @classmethod
     async def extract_stores_data_for_db_type1(cls, stores_data_dict: dict) -> dict[str, list[dict]]:
         """
@@ -1,13 +1,24 @@
 import httpx
 import asyncio
 import re
+import time
+import weakref
 from datetime import datetime
 import json
 
 from backend.utilities.url_request import url_request
+from backend.utilities.executor import run_blocking
+from backend.utilities.file_catalog import FileCatalog, FileRecord
 from backend.core.super_class import SupermarketChain
 
 
+# Parsed manifest of the portal page per chain - reloaded after MANIFEST_TTL or when the date folder changes
+MANIFEST_TTL = 10 * 60  # Seconds
+PRICE_TYPES = ["PromoFull", "Promo", "PriceFull", "Price"]
+_manifests = {}  # chain alias -> {'date', 'time', 'store_urls', 'catalog': FileCatalog of price / promo files}
+_manifest_builds = weakref.WeakKeyDictionary()  # event loop -> {chain alias: running manifest task}
+
+
 class CarrefourParent(SupermarketChain):
     abstract = True
 
@@ -20,7 +31,7 @@ class CarrefourParent(SupermarketChain):
         # Get store list
         try:
             # Get response from the URL
-            response = await url_request(base, client=client)
+            response = await url_request(base, client=client, hedge=True)
             html = response['response'].decode('utf-8', errors='ignore')
 
             # Extract JSON - handles both JSON.parse`...` and direct array [...] - in the source file
@@ -31,7 +42,7 @@ class CarrefourParent(SupermarketChain):
             # Get whichever group matched (group 1 for JSON.parse, group 2 for direct array of dicts)
             json_str = match.group(1) or match.group(2)
             try:
-                files = json.loads(json_str)
+                files = await run_blocking(json.loads, json_str)
                 # If match is of second type => extract value of 'name' key in all the dicts in json
                 if json_str == match.group(2):
                     files = [d['name'] for d in files]
@@ -83,47 +94,97 @@ class CarrefourParent(SupermarketChain):
 
         return max(urls, key=lambda url: extract_date(url))
 
+    @classmethod
+    def file_datetime(cls, url: str) -> datetime | None:
+        """ Date and time of price/promo file from its name - YYYYMMDD followed by optional HHMM or HHMMSS """
+        # Pattern matches YYYYMMDD followed by optional HHMM or HHMMSS at the end of the file name
+        # (not the date folder or the chain code digits)
+        pattern = r'(\d{8})(?:-?(\d{4,6}))?\.\w+$'
+
+        match = re.search(pattern, url.split('?')[0])
+        if match:
+            date_part = match.group(1)  # YYYYMMDD
+            time_part = match.group(2)  # HHMM or HHMMSS (if exists)
+
+            if time_part:
+                if len(time_part) == 4:
+                    # HHMM format
+                    datetime_str = date_part + time_part
+                    return datetime.strptime(datetime_str, '%Y%m%d%H%M')
+                elif len(time_part) == 6:
+                    # HHMMSS format
+                    datetime_str = date_part + time_part
+                    return datetime.strptime(datetime_str, '%Y%m%d%H%M%S')
+            else:
+                # Date only
+                return datetime.strptime(date_part, '%Y%m%d')
+
+        return None
+
     @classmethod
     async def latest_prices(cls, urls: list[str]) -> str:
         """ Get the latest price/promo file from a given list of URLs. """
-        def extract_datetime(url: str):
-            # # Extract the date and time
-            # return int(url.split('-')[-1].split('.')[0])
-            # Pattern matches YYYYMMDD followed by optional HHMM or HHMMSS
-            pattern = r'(\d{8})(?:-?(\d{4,6}))?'
+        return max(urls, key=cls.file_datetime)
 
-            match = re.search(pattern, url)
-            if match:
-                date_part = match.group(1)  # YYYYMMDD
-                time_part = match.group(2)  # HHMM or HHMMSS (if exists)
-
-                if time_part:
-                    if len(time_part) == 4:
-                        # HHMM format
-                        datetime_str = date_part + time_part
-                        return datetime.strptime(datetime_str, '%Y%m%d%H%M')
-                    elif len(time_part) == 6:
-                        # HHMMSS format
-                        datetime_str = date_part + time_part
-                        return datetime.strptime(datetime_str, '%Y%m%d%H%M%S')
-                else:
-                    # Date only
-                    return datetime.strptime(date_part, '%Y%m%d')
-
-            return None
-        return max(urls, key=lambda url: extract_datetime(url))
+    @classmethod
+    async def build_manifest(cls, date: str) -> dict:
+        """
+        Download the portal page once and index its files - store files and a catalog of price/promo files
+        """
+        all_urls = await cls.full_urls()
+        if 'Error' in all_urls:
+            return all_urls
+
+        catalog = FileCatalog()
+        store_urls = []
+        for url in all_urls['full_urls']:
+            if 'store' in url.lower():
+                store_urls.append(url)
+                continue
+            file_type = next((t for t in PRICE_TYPES if t in url), None)
+            try:
+                store_code = int(url.split('-')[1])
+                file_time = cls.file_datetime(url)
+            except (IndexError, ValueError):
+                continue
+            if file_type is None or file_time is None:
+                continue
+            catalog.add(FileRecord(file_time, url, cls.alias, store_code, file_type.lower()))
+
+        return {'date': date, 'time': time.monotonic(), 'store_urls': store_urls, 'catalog': catalog}
+
+    @classmethod
+    async def manifest(cls) -> dict:
+        """
+        Cached manifest of the chain files - reloaded when older than MANIFEST_TTL or a new date folder started.
+        Concurrent callers on the same event loop wait for one download.
+        """
+        date = await cls.make_date_str()
+        manifest = _manifests.get(cls.alias)
+        if manifest is not None and manifest['date'] == date and time.monotonic() - manifest['time'] < MANIFEST_TTL:
+            return manifest
+
+        loop = asyncio.get_running_loop()
+        builds = _manifest_builds.setdefault(loop, {})
+        task = builds.get(cls.alias)
+        if task is None:
+            task = builds[cls.alias] = loop.create_task(cls.build_manifest(date))
+            task.add_done_callback(lambda _: builds.pop(cls.alias, None))
+        manifest = await asyncio.shield(task)
+        if 'Error' not in manifest:
+            _manifests[cls.alias] = manifest
+        return manifest
 
     @classmethod
     async def stores(cls, client: httpx.AsyncClient | None = None) -> dict:
         """ This function gets latest store list for carrefour supermarket chain. """
-        all_urls = await cls.full_urls()
+        manifest = await cls.manifest()
         # If no errors:
-        if 'Error' not in all_urls.keys():
-            store_urls = [url for url in all_urls['full_urls'] if 'store' in url.lower()]
-            latest = await cls.latest_stores(store_urls)
+        if 'Error' not in manifest.keys():
+            store_urls = manifest['store_urls']
             return {'stores': store_urls[0] if store_urls else 'No Url'}
         else:
-            return all_urls
+            return manifest
 
     @classmethod
     async def price_urls_by_type(cls, urls: list[str]) -> dict:
@@ -140,22 +201,14 @@ class CarrefourParent(SupermarketChain):
     @classmethod
     async def prices(cls, store_code: int | str = None) -> dict:
         """ This function gets price and promo files for selected carrefour supermarket chain. """
-        # All urls for the chain
-        all_urls = await cls.full_urls()
+        # Manifest of all files of the chain, indexed by store
+        manifest = await cls.manifest()
         # If no errors:
-        if 'Error' not in all_urls.keys():
-            # Price and promo files for the selected store
-            price_urls = [url for url in all_urls['full_urls'] if int(url.split('-')[1]) == int(store_code)]
-            # Organize Urls by type and get latest for each type
-            price_urls_dict = await cls.price_urls_by_type(price_urls)
-            for key in price_urls_dict.keys():
-                if price_urls_dict[key]:
-                    price_urls_dict[key] = await cls.latest_prices(price_urls_dict[key])
-                else:
-                    price_urls_dict[key] = None
-            return price_urls_dict
+        if 'Error' not in manifest.keys():
+            # Latest file of each type for the selected store
+            return manifest['catalog'].latest_urls(store_code, {t: t.lower() for t in PRICE_TYPES})
         else:
-            return all_urls
+            return manifest
 
     @classmethod
     async def extract_stores_data_for_db(cls, stores_data_dict: dict) -> dict[str, list[dict]]:
@@ -2,11 +2,26 @@ import httpx
 from bs4 import BeautifulSoup
 import asyncio
 import re
+import time
+from datetime import datetime, timedelta
 
 from backend.utilities.url_request import url_request
+from backend.utilities.executor import run_blocking
+from backend.utilities.http_client import pooled_client
+from backend.utilities.file_catalog import FileCatalog, parse_file_url
 from backend.core.super_class import SupermarketChain
 
 
+# Incremental listing - links seen before are kept and pages are read only until already known files
+LISTING_TTL = 10 * 60  # Seconds - a younger listing is used without any request
+FULL_CRAWL_INTERVAL = 6 * 3600  # Seconds - all pages are crawled again after this
+KEEP_FILES_DAYS = 2  # Links older than this (before the newest file) are dropped from the listing
+# file type -> {'links', 'catalog' (FileCatalog of links), 'watermark' (newest timestamp seen), 'checked', 'crawled'}
+_listings = {}
+# Key returned by prices() -> catalog file type
+CATALOG_TYPES = {'PromoFull': 'promofull', 'Promo': 'promo', 'PriceFull': 'pricefull', 'Price': 'price'}
+
+
 class HaziHinam(SupermarketChain):
     abstract = False
     name = 'כל בו חצי חינם בע"מ'
@@ -21,7 +36,7 @@ class HaziHinam(SupermarketChain):
         """
         This function gets the number of pages for HaziHinam supermarket chain.
         """
-        soup = BeautifulSoup(html, "lxml")
+        soup = await run_blocking(BeautifulSoup, html, "lxml", process_safe=False)
         pagination = soup.find("ul", class_="pagination")
         li_items = pagination.find_all("li")
         if not pagination:
@@ -31,7 +46,7 @@ class HaziHinam(SupermarketChain):
     @classmethod
     async def parse_html_for_files(cls, html: str) -> dict:
         """ Parse HTML to extract file URLs. """
-        soup = BeautifulSoup(html, "lxml")
+        soup = await run_blocking(BeautifulSoup, html, "lxml", process_safe=False)
         links = [
             a["href"]
             for a in soup.find_all("a", href=True)
@@ -71,17 +86,70 @@ class HaziHinam(SupermarketChain):
         except Exception as e:
             return {'Error': str(e)}
 
+    @classmethod
+    def file_timestamp(cls, url: str) -> int:
+        """ Timestamp of file name as int - 20251108-100919 → 20251108100919 (0 if missing) """
+        match = re.search(r"(\d{8})-(\d{6})", url)
+        if match:
+            date_str, time_str = match.groups()  # '20251108', '100919'
+            return int(date_str + time_str)
+        return 0
+
     @classmethod
     async def latest(cls, urls: list[str]) -> str:
         """ Get the latest file from a given list of URLs. """
-        def extract_date(url: str):
-            match = re.search(r"(\d{8})-(\d{6})", url)
-            if match:
-                date_str, time_str = match.groups()  # '20251108', '100919'
-                combined_int = int(date_str + time_str)  # → 20251108100919
-                return combined_int
+        return max(urls, key=cls.file_timestamp)
 
-        return max(urls, key=lambda url: extract_date(url))
+    @classmethod
+    async def crawl_files(cls, file_type: int, client: httpx.AsyncClient | None = None) -> dict:
+        """
+        Incremental version of get_files - pages (newest files first) are read one by one only until
+        a page reaches a file not newer than the newest file seen before (watermark).
+        New links are merged into the cached listing of the file type.
+        """
+        listing = _listings.get(file_type)
+        now = time.monotonic()
+        if listing is not None and now - listing['checked'] < LISTING_TTL:
+            return {'response': listing['links']}
+
+        if listing is None or now - listing['crawled'] > FULL_CRAWL_INTERVAL:
+            # First call / periodic full crawl - also catches files published out of order
+            result = await cls.get_files(file_type=file_type, client=client)
+            if 'Error' in result:
+                return result
+            links = result['response']
+            _listings[file_type] = listing = {'links': [], 'catalog': FileCatalog(), 'watermark': 0,
+                                              'checked': now, 'crawled': now}
+        else:
+            base = await cls.get_url()
+            links = []
+            page, page_num = 1, 1
+            while page <= page_num:
+                url = f'{base}?p={page}&t={file_type}' if page > 1 else f'{base}?t={file_type}'
+                response = await url_request(url, client=client)
+                if 'Error' in response:
+                    return response
+                html = response.get('response', '')
+                if page == 1:
+                    page_num = (await cls.get_num_pages(html)).get('response', 0)
+                page_links = (await cls.parse_html_for_files(html)).get('result', [])
+                links.extend(page_links)
+                # Known files reached → the following pages hold only older files
+                if not page_links or any(cls.file_timestamp(url) <= listing['watermark'] for url in page_links):
+                    break
+                page += 1
+
+        # Merge new links into the listing and drop files much older than the newest
+        catalog = listing['catalog']
+        catalog.extend(parse_file_url(url, cls.alias) for url in links if url not in catalog)
+        watermark = max([listing['watermark'], *(cls.file_timestamp(url) for url in links)])
+        cutoff = datetime.strptime(str(watermark), '%Y%m%d%H%M%S') - timedelta(days=KEEP_FILES_DAYS) \
+            if watermark else datetime.min
+        catalog.prune(cutoff)
+        cutoff = int(cutoff.strftime('%Y%m%d%H%M%S')) if watermark else 0
+        merged = dict.fromkeys(url for url in [*links, *listing['links']] if cls.file_timestamp(url) >= cutoff)
+        listing.update(links=list(merged), watermark=watermark, checked=now)
+        return {'response': listing['links']}
 
     @classmethod
     async def stores(cls, file_type: int = 3, client: httpx.AsyncClient | None = None):
@@ -112,14 +180,14 @@ class HaziHinam(SupermarketChain):
     async def get_price_files(cls):
         """
         Function to get all price/pricefull and promo/promofull urls from site
-        Helper function for prices function
+        Helper function for prices function - incremental, the full catalog is not crawled on every call
         """
         tasks = {}
-        async with httpx.AsyncClient() as client:
+        async with pooled_client(cls.url) as client:
             async with asyncio.TaskGroup() as tg:
                 # file types 1 and 2
                 for file_type in (1, 2):
-                    tasks[file_type] = tg.create_task(cls.get_files(file_type=file_type, client=client))
+                    tasks[file_type] = tg.create_task(cls.crawl_files(file_type=file_type, client=client))
 
         # TaskGroup completed → safe to read results
         urls = []
@@ -134,19 +202,15 @@ class HaziHinam(SupermarketChain):
     async def prices(cls, store_code: int | str):
         """ This function gets price and promo files for hazihinam supermarket chain. """
         try:
-            # Get all file links
-            file_links = await cls.get_price_files()
-
-            all_urls = file_links.get('response', [])
-            # Filter price and promo files for the selected store
-            price_urls = [url for url in all_urls if int(url.split('-')[2]) == int(store_code)]
-            # Organize Urls by type and get latest for each type
-            price_urls_dict = await cls.price_urls_by_type(price_urls)
-            for key in price_urls_dict.keys():
-                if price_urls_dict[key]:
-                    price_urls_dict[key] = await cls.latest(price_urls_dict[key])
-                else:
-                    price_urls_dict[key] = None
+            # Bring the listings (and their catalogs) up to date
+            await cls.get_price_files()
+
+            # Latest file of each type for the store - the types may be in either listing
+            catalogs = [_listings[file_type]['catalog'] for file_type in (1, 2) if file_type in _listings]
+            price_urls_dict = {}
+            for key, file_type in CATALOG_TYPES.items():
+                records = [r for r in (c.latest(store_code, file_type) for c in catalogs) if r is not None]
+                price_urls_dict[key] = max(records).url if records else None
             return price_urls_dict
         except Exception as e:
             return {'Error': str(e)}
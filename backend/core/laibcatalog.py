@@ -1,12 +1,24 @@
 import httpx
 from bs4 import BeautifulSoup
 import asyncio
+import time
+import weakref
 from urllib.parse import urljoin
 
 from backend.utilities.url_request import url_request
+from backend.utilities.executor import run_blocking
+from backend.utilities.file_catalog import FileCatalog, parse_file_url
 from backend.core.super_class import SupermarketChain
 
 
+# Listing of the whole portal, shared by all chains hosted on it - downloaded again after LISTING_TTL
+LISTING_TTL = 10 * 60  # Seconds
+_portals = {}  # portal url -> {'time', 'chains': {chain_code: {'urls': [...], 'catalog': FileCatalog}}}
+# Key returned by prices() -> catalog file type
+CATALOG_TYPES = {'PromoFull': 'promofull', 'Promo': 'promo', 'PriceFull': 'pricefull', 'Price': 'price'}
+_portal_builds = weakref.WeakKeyDictionary()  # event loop -> {portal url: running listing task}
+
+
 class LaibCatalog(SupermarketChain):
     abstract = True
 
@@ -15,7 +27,7 @@ class LaibCatalog(SupermarketChain):
         """ This function parses the HTML response using BeautifulSoup. """
         # class info
         base = await cls.get_url()
-        soup = BeautifulSoup(response, "lxml")
+        soup = await run_blocking(BeautifulSoup, response, "lxml", process_safe=False)
         # Find the table inside the div with id="download_content"
         rows = soup.select("#download_content table tr")[1:]
         # Extract all hrefs from <a> tags inside that table
@@ -34,22 +46,71 @@ class LaibCatalog(SupermarketChain):
         return [url for url in urls if code in url]
 
     @classmethod
-    async def all_urls_for_chain(cls, client: httpx.AsyncClient | None = None) -> list | dict:
-        """ This function gets store list for laibcatalog supermarket chains. """
+    async def build_portal_listing(cls, client: httpx.AsyncClient | None = None) -> dict:
+        """
+        Download and parse the portal table once and partition it by chain code (url list and file catalog)
+        for all chains hosted on the portal.
+        """
         base = await cls.get_url()
-        # Get store list
         try:
             # Get response from the URL
-            response = await url_request(base, client=client, )
-            # Parse the response to extract store links
+            response = await url_request(base, client=client, hedge=True)
+            if 'Error' in response:
+                return response
+            # Parse the response to extract all links
             all_links = await cls.parse_response(response['response'])
-            all_for_chain = await cls.chain_links(all_links)
-            return {'urls': all_for_chain}
         except httpx.HTTPStatusError as e:
             return {'Error': f"HTTP error: {e.response.status_code} - {e.response.text}"}
         except httpx.RequestError as e:
             return {'Error': f"Request error: {str(e)}"}
 
+        # Chains hosted on the same portal
+        codes = {c.chain_code for c in SupermarketChain.registry
+                 if issubclass(c, LaibCatalog) and getattr(c, 'url', None) == base}
+        codes.add(await cls.get_code())
+
+        chains = {code: {'urls': [], 'catalog': FileCatalog()} for code in codes}
+        for url in all_links:
+            code = next((code for code in codes if code in url), None)
+            if code is None:
+                continue
+            chains[code]['urls'].append(url)
+            chains[code]['catalog'].extend([parse_file_url(url, code)])
+
+        return {'time': time.monotonic(), 'chains': chains}
+
+    @classmethod
+    async def portal_listing(cls, client: httpx.AsyncClient | None = None) -> dict:
+        """
+        Cached listing of the portal - downloaded again when older than LISTING_TTL.
+        Concurrent callers on the same event loop (any chain of the portal) wait for one download.
+        """
+        base = await cls.get_url()
+        listing = _portals.get(base)
+        if listing is not None and time.monotonic() - listing['time'] < LISTING_TTL \
+                and await cls.get_code() in listing['chains']:
+            return listing
+
+        loop = asyncio.get_running_loop()
+        builds = _portal_builds.setdefault(loop, {})
+        task = builds.get(base)
+        if task is None:
+            task = builds[base] = loop.create_task(cls.build_portal_listing(client=client))
+            task.add_done_callback(lambda _: builds.pop(base, None))
+        listing = await asyncio.shield(task)
+        if 'Error' not in listing:
+            _portals[base] = listing
+        return listing
+
+    @classmethod
+    async def all_urls_for_chain(cls, client: httpx.AsyncClient | None = None) -> list | dict:
+        """ This function gets store list for laibcatalog supermarket chains. """
+        listing = await cls.portal_listing(client=client)
+        if 'Error' in listing:
+            return listing
+        chain = listing['chains'].get(await cls.get_code(), {})
+        return {'urls': chain.get('urls', [])}
+
     @classmethod
     async def get_latest(cls, urls: list[str]) -> str:
         """ Get the latest file from a given list of URLs. """
@@ -79,15 +140,15 @@ class LaibCatalog(SupermarketChain):
     @classmethod
     async def prices_for_store(cls, store_code: int | str) -> dict:
         """ This function gets price and promo files for selected laibcatalog supermarket chain. """
-        # All urls for the chain
-        all_urls = await cls.all_urls_for_chain()
+        # Portal listing partitioned by chain and store
+        listing = await cls.portal_listing()
         # If no errors:
-        if 'Error' not in all_urls.keys():
+        if 'Error' not in listing.keys():
             # Price and promo files for the selected store
-            store_urls = [url for url in all_urls['urls'] if await cls.extract_store_code(url) == int(store_code)]
-            return {'prices': store_urls}
+            chain = listing['chains'].get(await cls.get_code())
+            return {'prices': [record.url for record in chain['catalog'].records(store_code)] if chain else []}
         else:
-            return all_urls
+            return listing
 
     @classmethod
     async def price_urls_by_type(cls, urls: list[str]) -> dict:
@@ -104,19 +165,16 @@ class LaibCatalog(SupermarketChain):
     @classmethod
     async def prices(cls, store_code: int | str) -> dict:
         """ This function gets price and promo files for selected laibcatalog supermarket chain. """
-        # Get price URLs for the selected store
-        all_urls = await cls.prices_for_store(store_code)
+        # Portal listing with the file catalog of the chain
+        listing = await cls.portal_listing()
         # No errors
-        if 'Error' not in all_urls.keys():
-            urls_by_type = await cls.price_urls_by_type(all_urls['prices'])
-            result = {}
-            for key in urls_by_type.keys():
-                latest_url = await cls.get_latest(urls_by_type[key]) if urls_by_type[key] else None
-                if latest_url is not None:
-                    result[key] = latest_url
-            return result
+        if 'Error' not in listing.keys():
+            chain = listing['chains'].get(await cls.get_code())
+            urls = chain['catalog'].latest_urls(store_code, CATALOG_TYPES) if chain else {}
+            # Only types the store has files of
+            return {key: url for key, url in urls.items() if url is not None}
         else:
-            return all_urls
+            return listing
 
     @classmethod
     async def extract_stores_data_for_db(cls, stores_data_dict: dict) -> dict[str, list[dict]]:
@@ -1,113 +1,223 @@
 import httpx
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
-from playwright.async_api import Page, BrowserContext
+from playwright.async_api import Page
 from datetime import datetime
+import json
 import re
+import time
 import asyncio
 from backend.core.super_class import SupermarketChain
+from backend.utilities.url_request import url_request
+from backend.utilities.executor import run_blocking
+from backend.utilities.file_catalog import FileCatalog, parse_file_url
+from backend.utilities.browser_session import browser_session, get_browser_manager
+from backend.utilities.backend_loop import in_backend_loop
+
+
+# Listings of a chain are reused this long - sweep() lists all chains at once, stores() / prices() reuse them
+LISTING_TTL = 5 * 60  # Seconds
+SWEEP_CONCURRENCY = 4  # Chains logged in and listed at the same time
+_listings = {}  # (url, username) -> (time.monotonic(), crawl_files result)
+# Keys of the prices() result - canonical file types of the catalog
+PRICE_TYPES = ('price', 'pricefull', 'promo', 'promofull')
 
 
 class PublishedPrices(SupermarketChain):
     abstract = True
+    # Rows per request to the file list endpoint - most chains fit in one request
+    listing_page_size = 5000
+
+    @classmethod
+    def target_url(cls) -> str:
+        """ URL of the page listing the chain files """
+        url = getattr(cls, 'url', '')
+        target_url = f'{url[:-5]}file'
+        if getattr(cls, 'username', '') == 'yuda_ho':
+            target_url = f'{target_url}/d/Yuda/'
+        return target_url
+
+    @classmethod
+    async def login(cls, page: Page):
+        """ Log in to the chain portal - called by the browser session manager only when the session expired """
+        # Go to login page
+        await page.goto(getattr(cls, 'url', ''))
+        # Fill credentials and press submit
+        await page.fill("input[name='username']", getattr(cls, 'username', ''))
+        await page.fill("input[name='password']", getattr(cls, 'password', ''))  # if required
+        await page.click("button[type='submit']")
+        # Wait for redirect after login
+        await page.wait_for_load_state("networkidle", timeout=80000)
+
+    @classmethod
+    async def collect_links(cls, page: Page) -> list[str]:
+        """ Collect all file links from the file table, page by page """
+        all_links = []
+        # 1️⃣ Try to set the rows-per-page dropdown to 1000
+        select = page.locator("select[name='fileList_length']")
+        try:
+            await select.select_option("1000")
+            # Wait for table to refresh
+            await page.wait_for_timeout(1000)  # short wait for JS
+        except Exception:
+            # If "1000" is not an option, skip
+            pass
+
+        while True:
+            # 2️⃣ Collect links on the current page
+            links = await page.eval_on_selector_all(
+                        "table a.f",
+                        "els => els.map(e => e.href)"
+                    )
+            all_links.extend(links)
+
+            # 3️⃣ Check if "Next" button is disabled
+            next_li = page.locator("li#fileList_next")
+            class_name = await next_li.get_attribute("class")
+            if "disabled" in class_name:
+                break  # no more pages
+
+            # 4️⃣ Click Next and wait for table to redraw
+            await next_li.locator("a").click()
+            await page.wait_for_timeout(1000)  # adjust if needed
+
+        return all_links
+
+    @classmethod
+    async def list_files_http(cls, cookies: dict[str, str]) -> list[str] | None:
+        """
+        Get all file links from the portal file list endpoint (the JSON behind the DataTables widget)
+        with the cookies of the logged in session - no browser paging.
+        Returns None if the listing failed (e.g. session expired), so the caller can fall back to the browser.
+        """
+        target_url = cls.target_url()
+        base_url = target_url.split('/file', 1)[0]
+        # Folder listed by the file page - '/' or '/Yuda' ...
+        folder = '/' + target_url.split('/file/d/', 1)[1].strip('/') if '/file/d/' in target_url else '/'
+
+        # csrf token is in the file page
+        page = await url_request(target_url, cookies=cookies)
+        if 'Error' in page:
+            return None
+        match = re.search(rb'<meta\s+name="csrftoken"\s+content="([^"]+)"', page['response'])
+        if not match:
+            return None
+        csrftoken = match.group(1).decode()
+
+        links = []
+        start = 0
+        while True:
+            payload = {
+                'sEcho': 1,
+                'iColumns': 5,
+                'iDisplayStart': start,
+                'iDisplayLength': cls.listing_page_size,
+                'sSearch': '',
+                'iSortCol_0': 0,
+                'sSortDir_0': 'asc',
+                'cd': folder,
+                'csrftoken': csrftoken,
+            }
+            result = await url_request(f'{base_url}/file/json/dir', cookies=cookies, method="POST",
+                                       payload=payload, hedge=True)
+            if 'Error' in result:
+                return None
+            try:
+                data = await run_blocking(json.loads, result['response'])
+            except ValueError:
+                return None  # Login page instead of JSON
+
+            rows = data.get('aaData', [])
+            prefix = f'{base_url}/file/d' + ('' if folder == '/' else folder)
+            links.extend(f"{prefix}/{row['fname']}" for row in rows
+                         if row.get('fname') and row.get('ftype') != 'folder')
+            start += len(rows)
+            if not rows or start >= int(data.get('iTotalDisplayRecords', 0)):
+                break
+
+        return links
 
     @classmethod
-    async def crawl_files(cls, ):
+    async def crawl_files(cls, max_age: float = LISTING_TTL):
         """
         This function crawls files for publishedprices supermarket chains and returns a dict with:
         -cookies
         -list of all file links
+        A listing younger than max_age seconds (e.g. from sweep()) is reused.
         """
-        # Get login details for chain
-        url = getattr(cls, 'url', '')
-        target_url = f'{url[:-5]}file'
-        username = getattr(cls, 'username', '')
-        password = getattr(cls, 'password', '')
+        key = (getattr(cls, 'url', ''), getattr(cls, 'username', ''))
+        listed = _listings.get(key)
+        if listed is not None and time.monotonic() - listed[0] < max_age:
+            return listed[1]
+
+        result = await cls.fetch_files()
+        if result.get('links'):
+            result['catalog'] = await run_blocking(cls.build_catalog, result['links'])
+            _listings[key] = (time.monotonic(), result)
+        return result
 
-        if username == 'yuda_ho':
-            target_url = f'{target_url}/d/Yuda/'
+    @classmethod
+    def build_catalog(cls, links: list[str]) -> FileCatalog:
+        """ Catalog of the listed price / promo files, parsed with the file name pattern of the chain """
+        pattern = cls.pattern()
+        return FileCatalog(parse_file_url(url, cls.alias, pattern) for url in links)
 
-        browser_config = BrowserConfig(
-            headless=True,
-        )
+    @classmethod
+    async def sweep(cls, chains: list | None = None) -> dict[str, dict]:
+        """
+        Log in and list files of all PublishedPrices chains (or the given ones) concurrently in the one shared
+        browser - a context per chain, at most SWEEP_CONCURRENCY chains at a time.
+        Listings are cached, so stores() / prices() of every chain use them without a browser.
+        """
+        chains = chains or [c for c in SupermarketChain.registry if issubclass(c, cls)]
+        sem = asyncio.Semaphore(SWEEP_CONCURRENCY)
 
-        crawler_config = CrawlerRunConfig(
-            cache_mode=CacheMode.BYPASS,
-            delay_before_return_html=5,
-            session_id="hn_session"
-        )
+        async def limited(chain):
+            """ Crawl chain with semaphore limitation - a failed chain does not stop the others """
+            async with sem:
+                try:
+                    return await chain.crawl_files()
+                except Exception as e:
+                    print(f"Error listing files for {chain.alias}: {e}")
+                    return {}
 
-        crawler = AsyncWebCrawler(config=browser_config)
-
-        result_holder = {}
-
-        async def on_page_context_created(page: Page, context: BrowserContext, **kwargs):
-            # Called right after a new page + context are created (ideal for auth or route config).
-            print("[HOOK] on_page_context_created - Setting up page & context.")
-
-            # Go to login page
-            await page.goto(url)
-            # Fill credentials and press submit
-            await page.fill("input[name='username']", username)
-            await page.fill("input[name='password']", password)  # if required
-            await page.click("button[type='submit']")
-            # Wait for redirect after login
-            await page.wait_for_load_state("networkidle", timeout=80000)
-            # If redirect is not the target url with files
-            if page.url != target_url:
-                # Go to target url
-                await page.goto(target_url)
-                # Wait for redirect
-                await page.wait_for_load_state("networkidle", timeout=80000)
+        results = await asyncio.gather(*(limited(chain) for chain in chains))
+        return {chain.alias: result for chain, result in zip(chains, results)}
 
-            # On page with files:
-            # Get cookies
-            result_holder['cookies'] = await context.cookies()
-            # Convert Playwright cookies (list of dicts) to a requests-compatible dict
-            result_holder['cookies'] = cls.playwright_cookies_to_requests(result_holder['cookies'])
+    @classmethod
+    async def fetch_files(cls, ):
+        """
+        Log in (if the kept session expired) and list files of the chain - dict with cookies and links.
+        The browser and the logged in session are kept between calls (see browser_session).
+        Files are listed over HTTP with the session cookies, the browser file table is only the fallback.
+        Runs on the backend loop, where the shared browser lives.
+        """
+        return await in_backend_loop(cls._fetch_files())
 
-            all_links = []
-            # 1️⃣ Try to set the rows-per-page dropdown to 1000
-            select = page.locator("select[name='fileList_length']")
-            try:
-                await select.select_option("1000")
-                # Wait for table to refresh
-                await page.wait_for_timeout(1000)  # short wait for JS
-            except Exception:
-                # If "1000" is not an option, skip
-                pass
-
-            while True:
-                # 2️⃣ Collect links on the current page
-                links = await page.eval_on_selector_all(
-                            "table a.f",
-                            "els => els.map(e => e.href)"
-                        )
-                all_links.extend(links)
-
-                # 3️⃣ Check if "Next" button is disabled
-                next_li = page.locator("li#fileList_next")
-                class_name = await next_li.get_attribute("class")
-                if "disabled" in class_name:
-                    break  # no more pages
-
-                # 4️⃣ Click Next and wait for table to redraw
-                await next_li.locator("a").click()
-                await page.wait_for_timeout(1000)  # adjust if needed
-
-            result_holder['links'] = all_links
-
-        # Run the hook and the crawler
-        crawler.crawler_strategy.set_hook(
-            "on_page_context_created", on_page_context_created
-        )
+    @classmethod
+    async def _fetch_files(cls, ):
+        """ fetch_files on the backend loop """
+        # Get login details for chain
+        url = getattr(cls, 'url', '')
+        username = getattr(cls, 'username', '')
+        target_url = cls.target_url()
 
-        try:
-            await crawler.start()
-            await crawler.arun(target_url, config=crawler_config)
-            return result_holder
+        # Second attempt only if the portal ended the session before its TTL
+        for _ in range(2):
+            session = await browser_session(url, username, cls.login)
+            links = await cls.list_files_http(session.cookies)
+            if links:
+                return {'cookies': session.cookies, 'links': links}
 
-        finally:
-            await crawler.close()
+            async with session.page() as page:
+                await page.goto(target_url)
+                await page.wait_for_load_state("networkidle", timeout=80000)
+                if page.url.startswith(url):
+                    # Redirected to login page - log in again
+                    await get_browser_manager().invalidate(url, username)
+                    continue
+                links = await cls.collect_links(page)
+            return {'cookies': session.cookies, 'links': links}
+
+        return {}
 
     @classmethod
     def playwright_cookies_to_requests(cls, playwright_cookies):
@@ -165,45 +275,36 @@ class PublishedPrices(SupermarketChain):
         This function gets price and promo files for publishedprices supermarket chain class.
         """
         result_holder = await cls.crawl_files()
-        all_links = result_holder.get('links', [])
-
-        def get_latest_file(urls: list[str], store_code: int | str) -> dict:
-            """
-                Given a list of URLs from publishedprices.co.il and a specific store code (e.g., '001'),
-                return a dict mapping each file type ('Price', 'PriceFull', 'Promo', 'PromoFull')
-                to the latest URL for that store.
-                """
-            pattern = cls.pattern()
-
-            latest = {}
-
-            for url in urls:
-                match = pattern.search(url)
-                if not match:
-                    continue
+        # Catalog of the listing - built once per listing by crawl_files
+        catalog = result_holder.get('catalog') or await run_blocking(cls.build_catalog, result_holder.get('links', []))
 
-                file_type, code_str, date, time = match.groups()
-                code = int(code_str)  # convert to int
-                if code != store_code:
-                    continue  # skip other stores
-
-                time = time.ljust(6, "0")  # ensure HHMMSS format
-                dt = datetime.strptime(date + time, "%Y%m%d%H%M%S")
-
-                # Keep only the latest datetime per file type
-                if file_type not in latest or dt > latest[file_type]["dt"]:
-                    latest[file_type] = {"url": url, "dt": dt}
-
-            # Return simplified mapping: file_type -> url
-            return {file_type.lower(): data["url"] for file_type, data in latest.items()}
-
-        # Get price and promo files for the specified store
-        result = get_latest_file(all_links, store_code=int(store_code))
+        # Latest file of each type ('price', 'pricefull', 'promo', 'promofull') for the specified store
+        latest = catalog.latest_urls(store_code, {file_type: file_type for file_type in PRICE_TYPES})
+        result = {file_type: url for file_type, url in latest.items() if url is not None}
 
         result['cookies'] = result_holder.get('cookies', {})
 
         return result
 
+    @classmethod
+    async def prices_many(cls, store_codes: list[int | str], concurrency: int = 8) -> dict[str, dict | None]:
+        """ Latest files of many stores from one listing - one login and listing for all stores """
+        try:
+            result_holder = await cls.crawl_files()
+        except Exception as e:
+            print(f"Error getting prices for {cls.alias}: {e}")
+            return {str(store_code): None for store_code in store_codes}
+        catalog = result_holder.get('catalog') or await run_blocking(cls.build_catalog, result_holder.get('links', []))
+        cookies = result_holder.get('cookies', {})
+
+        results = {}
+        for store_code in store_codes:
+            latest = catalog.latest_urls(store_code, {file_type: file_type for file_type in PRICE_TYPES})
+            result = {file_type: url for file_type, url in latest.items() if url is not None}
+            result['cookies'] = cookies
+            results[str(store_code)] = result
+        return results
+
     @classmethod
     async def extract_stores_data_for_db_type1(cls, stores_data_dict: dict) -> dict[str, list[dict]]:
         """
@@ -0,0 +1,95 @@
+""" Lightweight registry of supermarket chains - metadata only, adapter modules are imported on first use """
+
+import importlib
+from typing import NamedTuple
+
+
+class ChainInfo(NamedTuple):
+    """ Metadata of one chain - enough for dropdowns and lookups without importing its adapter """
+    chain_code: str
+    alias: str
+    name: str
+    link_type: str
+    module: str  # Adapter module path
+    class_name: str  # Adapter class in the module
+
+
+# All chains available in the app (order as registered by the adapter modules)
+CHAINS = (
+    # binaprojects
+    ChainInfo('7290058108879', 'kingstore', 'אלמשהדאוי קינג סטור בע"מ', 'binaprojects', 'backend.core.binaprojects', 'KingStore'),
+    ChainInfo('7290058159628', 'maayan2000', 'ג.מ מעיין אלפיים (07) בע"מ', 'binaprojects', 'backend.core.binaprojects', 'Maayan2000'),
+    ChainInfo('7290058197699', 'goodpharm', 'גוד פארם בע"מ', 'binaprojects', 'backend.core.binaprojects', 'GoodPharm'),
+    ChainInfo('7290058173198', 'zulvbgadol', 'זול ובגדול בע"מ', 'binaprojects', 'backend.core.binaprojects', 'ZulvbGadol'),
+    ChainInfo('7290058156016', 'supersapir', 'סופר ספיר בע"מ', 'binaprojects', 'backend.core.binaprojects', 'SuperSapir'),
+    ChainInfo('7290058266241', 'citymarket', 'סיטי מרקט', 'binaprojects', 'backend.core.binaprojects', 'CityMarket'),
+    ChainInfo('7290875100001', 'superbareket', 'עוף והודו ברקת - חנות המפעל בע"מ', 'binaprojects', 'backend.core.binaprojects', 'SuperBareket'),
+    ChainInfo('5144744100001', 'kt', 'קיי.טי. יבוא ושיווק בע"מ (משנת יוסף)', 'binaprojects', 'backend.core.binaprojects', 'KT'),
+    ChainInfo('7290058148776', 'shukhayir', 'שוק העיר (ט.ע.מ.ס) בע"מ', 'binaprojects', 'backend.core.binaprojects', 'ShukHayir'),
+    ChainInfo('7290058134977', 'shefabirkathashem', 'שפע ברכת השם בע"מ', 'binaprojects', 'backend.core.binaprojects', 'ShefaBirkatHashem'),
+    # carrefour
+    ChainInfo('7290055700007', 'carrefour', 'קרפור/ ביתן אונליין', 'carrefour', 'backend.core.carrefour', 'Carrefour'),
+    # hazihinam
+    # ChainInfo('7290700100008', 'hazihinam', 'כל בו חצי חינם בע"מ', 'hazihinam', 'backend.core.hazihinam', 'HaziHinam'),
+    # laibcatalog
+    # ChainInfo('7290696200003', 'victory', 'ויקטורי רשת סופרמרקטים בע"מ', 'laibcatalog', 'backend.core.laibcatalog', 'Victory'),
+    # ChainInfo('7290455000004', 'hcohen', 'ח. כהן סוכנות מזון ומשקאות בע"מ', 'laibcatalog', 'backend.core.laibcatalog', 'HCohen'),
+    # ChainInfo('7290661400001', 'knmarket', 'כ.נ מחסני השוק בע"מ', 'laibcatalog', 'backend.core.laibcatalog', 'KnMarket'),
+    # publishedprices
+    ChainInfo('7290058140886', 'ramilevi', 'רשת חנויות רמי לוי שיווק השקמה 2006 בע"מ', 'publishedprices', 'backend.core.publishedprices', 'RamiLevi'),
+    ChainInfo('7290492000005', 'doralon', 'דור אלון ניהול מתחמים קמעונאיים בע"מ', 'publishedprices', 'backend.core.publishedprices', 'DorAlon'),
+    ChainInfo('7290873255550', 'tivtaam', 'טיב טעם רשתות בע"מ', 'publishedprices', 'backend.core.publishedprices', 'TivTaam'),
+    ChainInfo('7290803800003', 'yohananof', 'מ. יוחננוף ובניו (1988) בע"מ', 'publishedprices', 'backend.core.publishedprices', 'Yochananof'),
+    ChainInfo('7290103152017', 'osherad', 'מרב-מזון כל בע"מ (אושר עד)', 'publishedprices', 'backend.core.publishedprices', 'OsherAd'),
+    ChainInfo('7290526500006', 'salahdabah', 'סאלח דבאח ובניו בע"מ', 'publishedprices', 'backend.core.publishedprices', 'SalahDabah'),
+    ChainInfo('7290639000004', 'stopmarket', 'סטופ מרקט בע"מ', 'publishedprices', 'backend.core.publishedprices', 'StopMarket'),
+    ChainInfo('7291059100008', 'politzer', 'פוליצר חדרה (1982) בע"מ', 'publishedprices', 'backend.core.publishedprices', 'Politzer'),
+    ChainInfo('7290785400000', 'keshettaamim', 'קשת טעמים בע"מ', 'publishedprices', 'backend.core.publishedprices', 'KeshetTaamim'),
+    # shufersal
+    ChainInfo('7290027600007', 'shufersal', 'שופרסל בע"מ (כולל רשת BE)', 'shufersal', 'backend.core.shufersal', 'Shufersal'),
+)
+
+# ChainInfo fields mirrored from the adapter class attributes
+METADATA_FIELDS = ('chain_code', 'alias', 'name', 'link_type')
+
+_by_code = {info.chain_code: info for info in CHAINS}
+_by_alias = {info.alias: info for info in CHAINS}
+
+
+def chain_info(chain_code: str | int) -> ChainInfo | None:
+    """ Metadata of the chain with the chain code - None if unknown """
+    return _by_code.get(str(chain_code))
+
+
+def chain_info_by_alias(alias: str) -> ChainInfo | None:
+    """ Metadata of the chain with the alias - None if unknown """
+    return _by_alias.get(alias)
+
+
+def load_chain(info: ChainInfo):
+    """
+    Chain class of the metadata - imports its adapter module on first use.
+    The metadata must match the class attributes (the class is the source of truth).
+    """
+    chain = getattr(importlib.import_module(info.module), info.class_name)
+    actual = tuple(getattr(chain, field, None) for field in METADATA_FIELDS)
+    if actual != info[:len(METADATA_FIELDS)]:
+        raise RuntimeError(f"Registry entry of {info.class_name} does not match the class: {info} != {actual}")
+    return chain
+
+
+def get_chain(chain_code: str | int):
+    """ Chain class of the chain code - None if unknown """
+    info = chain_info(chain_code)
+    return load_chain(info) if info else None
+
+
+def get_chain_by_alias(alias: str):
+    """ Chain class of the alias - None if unknown """
+    info = chain_info_by_alias(alias)
+    return load_chain(info) if info else None
+
+
+def load_chains(link_type: str | None = None) -> list:
+    """ Chain classes of all chains (or of one link type) - imports all their adapter modules """
+    return [load_chain(info) for info in CHAINS if link_type is None or info.link_type == link_type]
@@ -1,9 +1,21 @@
 import httpx
 import asyncio
+import time
+import weakref
+from urllib.parse import parse_qs, urlsplit
 from bs4 import BeautifulSoup
 
 from backend.core.super_class import SupermarketChain
 from backend.utilities.url_request import url_request
+from backend.utilities.executor import run_blocking
+from backend.utilities.http_client import pooled_client
+from backend.utilities.file_catalog import FileCatalog, parse_file_url
+
+
+# Chain-wide catalog of full price / promo files, rebuilt from the category listings when older than INDEX_TTL
+INDEX_TTL = 30 * 60  # Seconds
+FILE_TYPES = {'pricefull': 2, 'promofull': 4}  # Only the full files are used by the app
+_index_builds = weakref.WeakKeyDictionary()  # event loop -> running catalog rebuild task
 
 
 class Shufersal(SupermarketChain):
@@ -13,6 +25,8 @@ class Shufersal(SupermarketChain):
     chain_code = '7290027600007'
     url = 'https://prices.shufersal.co.il/'
     link_type = 'shufersal'
+    _catalog = FileCatalog()  # Price / promo files of all stores
+    _index_time = None  # time.monotonic() of last build
 
     @classmethod
     def extract_date_from_url(cls, url: str) -> dict:
@@ -31,18 +45,21 @@ class Shufersal(SupermarketChain):
 
     @classmethod
     async def get_file(cls, store_code: int | str | None = None, file_type: int = 0,
-                       client: httpx.AsyncClient | None = None) -> dict:
+                       client: httpx.AsyncClient | None = None, page: int | None = None) -> dict:
         """
         This function gets defined file for shufersal supermarket chain.
         file-type: 0 - all, 1-price, 2-pricefull, 3-promo, 4-promofull, 5 - stores
+        store_code 0 lists the files of all stores, page selects the page of the listing
         """
         base = cls.url
         # Get file of selected type for the relevant store
         try:
             # Define URL for file list
             url = f"{base}FileObject/UpdateCategory?catID={file_type}&storeId={store_code}"
+            if page:
+                url = f"{url}&page={page}"
             # Get response from the URL
-            response = await url_request(url, client=client)
+            response = await url_request(url, client=client, hedge=True)
             return response
 
         except ValueError as e:
@@ -51,8 +68,16 @@ class Shufersal(SupermarketChain):
     @classmethod
     def parse_response(cls, response: bytes) -> dict[str, list[str | None]]:
         """ This function parses the HTML response using BeautifulSoup. """
+        return {'response': cls.parse_listing(response)[0]}
+
+    @classmethod
+    def parse_listing(cls, response: bytes) -> tuple[list[str], int]:
+        """ File links of a listing page and the number of pages - highest page of the pager links, 1 without pager """
         soup = BeautifulSoup(response, "lxml")
-        return {'response': [a.get("href") for a in soup.select("table.webgrid tbody tr td a") if a.get("href")]}
+        links = [a.get("href") for a in soup.select("table.webgrid tbody tr td a") if a.get("href")]
+        # Pager hrefs are HTML escapes (&amp;page=2) - read the page from the unescaped href
+        pages = (parse_qs(urlsplit(a['href']).query).get('page', [''])[0] for a in soup.select("a[href]"))
+        return links, max((int(page) for page in pages if page.isdigit()), default=1)
 
     @classmethod
     async def stores(cls, ) -> dict:
@@ -61,35 +86,102 @@ class Shufersal(SupermarketChain):
         # Check if response contains 'response' key
         if response.get('response'):
             # Parse the response to extract store links
-            parsed = cls.parse_response(response.get('response'))
+            links, _ = await run_blocking(cls.parse_listing, response.get('response'))
             # Get the latest store url
-            latest = cls.latest(parsed.get('response'))
+            latest = cls.latest(links)
             return {'stores': latest.get('latest')}
         else:
             return response
 
+    @classmethod
+    async def list_category(cls, file_type: int) -> list[str]:
+        """ All file links of one category (file type) for all stores - first page, then the other pages at once """
+        first = await cls._fetch(0, file_type)
+        if not first.get('response'):
+            return []
+        # HTML is parsed in the executor - the backend loop only waits for the listings
+        links, last_page = await run_blocking(cls.parse_listing, first['response'])
+
+        results = await asyncio.gather(*(cls._fetch(0, file_type, page=page) for page in range(2, last_page + 1)))
+        for result in results:
+            if result.get('response'):
+                links.extend((await run_blocking(cls.parse_listing, result['response']))[0])
+        return links
+
+    @classmethod
+    async def build_catalog(cls) -> FileCatalog:
+        """
+        Walk the listings of price / promo files of all stores once into a catalog of all files
+        A handful of listing requests instead of four per store.
+        """
+        listings = await asyncio.gather(*(cls.list_category(file_type) for file_type in FILE_TYPES.values()))
+        return FileCatalog(parse_file_url(url, cls.alias) for links in listings for url in links)
+
+    @classmethod
+    async def refresh_catalog(cls) -> FileCatalog:
+        """ Rebuild the catalog - a failed rebuild keeps the previous catalog and is not retried before the TTL """
+        try:
+            catalog = await cls.build_catalog()
+            cls._catalog = catalog if len(catalog) else cls._catalog
+        except Exception as e:
+            print(f"Error listing files for {cls.alias}: {e}")
+        cls._index_time = time.monotonic()
+        return cls._catalog
+
+    @classmethod
+    async def file_catalog(cls, wait: bool = True) -> FileCatalog | None:
+        """
+        Chain-wide catalog of files - rebuilt when older than INDEX_TTL.
+        Concurrent callers on the same event loop share one rebuild.
+        wait=False does not wait for the rebuild - None while the catalog is being rebuilt.
+        """
+        if cls._index_time is not None and time.monotonic() - cls._index_time <= INDEX_TTL:
+            return cls._catalog
+        loop = asyncio.get_running_loop()
+        task = _index_builds.get(loop)
+        if task is None:
+            task = _index_builds[loop] = loop.create_task(cls.refresh_catalog())
+            task.add_done_callback(lambda _: _index_builds.pop(loop, None))
+        return await asyncio.shield(task) if wait else None
+
     @classmethod
     async def prices(cls, store_code: int | str, ) -> dict:
         """ This function gets latest price and promo files for relevant store for the shufersal supermarket chain. """
+        # Look up the chain-wide catalog first - a stale catalog is rebuilt in the background, not waited for
+        catalog = await cls.file_catalog(wait=False)
+        if catalog is not None:
+            urls = catalog.latest_urls(store_code, {name: name for name in FILE_TYPES})
+            if urls['pricefull'] and urls['promofull']:
+                return urls
+
+        # Catalog being rebuilt or store missing in it (e.g. new store or listing failed) → listings of the store
         async with asyncio.TaskGroup() as tg:
-            tasks = {
-                'price': tg.create_task(cls._fetch(store_code, 1)),
-                'pricefull': tg.create_task(cls._fetch(store_code, 2)),
-                'promo': tg.create_task(cls._fetch(store_code, 3)),
-                'promofull': tg.create_task(cls._fetch(store_code, 4)),
-            }
-        # Return dict with file types and latest url for that type - price, pricefull, promo, promofull
-        return {name: cls.latest(cls.parse_response(task.result().get('response')).get('response')).get('latest')
-                for name, task in tasks.items()}
-
-    @classmethod
-    async def _fetch(cls, store_code: int | str, file_type: int):
-        """ Helper function to create client used in get_file function """
-        async with httpx.AsyncClient(
-                verify=False,
-                timeout=httpx.Timeout(15.0),
-        ) as client:
-            return await cls.get_file(store_code, file_type, client=client)
+            tasks = {name: tg.create_task(cls._fetch(store_code, file_type)) for name, file_type in FILE_TYPES.items()}
+        # Return dict with file types and latest url for that type - pricefull, promofull
+        listings = {name: (await run_blocking(cls.parse_listing, task.result().get('response')))[0]
+                    for name, task in tasks.items()}
+        return {name: cls.latest(links).get('latest') for name, links in listings.items()}
+
+    @classmethod
+    async def prices_many(cls, store_codes: list[int | str], concurrency: int = 8) -> dict[str, dict | None]:
+        """ Latest files of many stores from the one chain-wide catalog - per store listings only for missing stores """
+        catalog = await cls.file_catalog()
+        results, missing = {}, []
+        for store_code in store_codes:
+            urls = catalog.latest_urls(store_code, {name: name for name in FILE_TYPES})
+            if urls['pricefull'] and urls['promofull']:
+                results[str(store_code)] = urls
+            else:
+                missing.append(store_code)
+        if missing:
+            results.update(await super().prices_many(missing, concurrency))
+        return results
+
+    @classmethod
+    async def _fetch(cls, store_code: int | str, file_type: int, page: int | None = None):
+        """ Helper function to get file list with the pooled client for the shufersal host """
+        async with pooled_client(cls.url) as client:
+            return await cls.get_file(store_code, file_type, client=client, page=page)
 
     @classmethod
     async def extract_stores_data_for_db(cls, stores_data_dict: dict) -> dict[str, list[dict]]:
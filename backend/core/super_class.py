@@ -1,3 +1,14 @@
+import asyncio
+import time
+import weakref
+
+
+# Resolved price urls per (chain code, store code) are reused this long - concurrent callers share one resolution
+RESOLVE_TTL = 60  # Seconds
+_resolved = {}  # (chain code, store code) -> (time.monotonic(), prices() result)
+_resolving = weakref.WeakKeyDictionary()  # event loop -> {(chain code, store code): running prices() task}
+
+
 class SupermarketChain:
     """ The parent class for all supermarket chains """
     registry = []  # holds all subclasses automatically
@@ -28,12 +39,53 @@ class SupermarketChain:
     ### Other general class methods
     @classmethod
     async def safe_prices(cls, store_code: int | str, ):
-        """ Wrapper for prices() that returns None if prices() raises an exception """
+        """
+        Wrapper for prices() that returns None if prices() raises an exception.
+        Results are reused for RESOLVE_TTL and concurrent calls for the same store wait for one prices() call.
+        """
+        key = (str(cls.chain_code), str(store_code))
+        cached = _resolved.get(key)
+        if cached is not None and time.monotonic() - cached[0] < RESOLVE_TTL:
+            return dict(cached[1])
+
+        loop = asyncio.get_running_loop()
+        tasks = _resolving.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = loop.create_task(cls._resolve_prices(store_code))
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+        result = await asyncio.shield(task)
+        return dict(result) if result else result
+
+    @classmethod
+    async def _resolve_prices(cls, store_code: int | str):
+        """ prices() → result or None on exception - successful results are kept for RESOLVE_TTL """
         try:
-            return await cls.prices(store_code)
+            result = await cls.prices(store_code)
         except Exception as e:
             print(f"Error getting prices for {cls.alias} store {store_code}: {e}")
             return None
+        # Error dicts and empty results are not cached
+        if result and 'Error' not in result:
+            _resolved[(str(cls.chain_code), str(store_code))] = (time.monotonic(), result)
+        return result
+
+    @classmethod
+    async def prices_many(cls, store_codes: list[int | str], concurrency: int = 8) -> dict[str, dict | None]:
+        """
+        Latest price and promo urls for many stores of the chain - {store_code: prices() result or None}
+        Default is safe_prices() per store, at most concurrency at a time (listings are cached by the chains).
+        Chains whose portal lists all stores at once override this to resolve all stores from one listing pass.
+        """
+        sem = asyncio.Semaphore(concurrency)
+
+        async def limited(store_code):
+            """ safe_prices with semaphore limitation """
+            async with sem:
+                return await cls.safe_prices(store_code)
+
+        results = await asyncio.gather(*(limited(store_code) for store_code in store_codes))
+        return {str(store_code): result for store_code, result in zip(store_codes, results)}
 
     @classmethod
     async def get_code(cls):
@@ -83,9 +135,10 @@ class SupermarketChain:
         }
 
     @classmethod
-    def get_price_data(cls, price_data: dict):
-        """ Extract the list of prices from task.result() """
-        items = (price_data.get("Root") or price_data.get("root"))["Items"]["Item"]
+    def get_price_data(cls, price_data: dict | list[dict]):
+        """ Extract the list of prices from task.result() - data_dict dict or data_items list """
+        items = price_data if isinstance(price_data, list) else \
+            (price_data.get("Root") or price_data.get("root"))["Items"]["Item"]
         for item in items:
             item["ChainAlias"] = cls.alias
 
@@ -101,9 +154,10 @@ class SupermarketChain:
         return results
 
     @classmethod
-    def get_promo_data(cls, promo_data: dict):
-        """ Extract the list of prices from task.result() """
-        items = (promo_data.get("Root") or promo_data.get("root"))["Promotions"]["Promotion"]
+    def get_promo_data(cls, promo_data: dict | list[dict]):
+        """ Extract the list of prices from task.result() - data_dict dict or data_items list """
+        items = promo_data if isinstance(promo_data, list) else \
+            (promo_data.get("Root") or promo_data.get("root"))["Promotions"]["Promotion"]
         for item in items:
             item["ChainAlias"] = cls.alias
 
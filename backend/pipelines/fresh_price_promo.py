@@ -2,54 +2,79 @@ import streamlit as st
 import asyncio
 
 from backend.services.async_runner import run_async
-from backend.services.session_state_service import force_value_into_session_state
-from backend.utilities.url_to_dict import data_dict
+from backend.utilities.url_to_dict import data_items
 from backend.utilities.general import session_code
-from backend.core.super_class import SupermarketChain
+from backend.core.registry import get_chain
+from backend.services.snapshot_store import SnapshotHandle, shared_snapshot, share_snapshot, snapshot_key
 
 
 # @st.cache_data(ttl=1800)
-async def fresh_price_data(chain_code: str | int, store_code: str | int, ) -> dict | None:
-    """ Fetch fresh data for the given chain and store code """
+async def fresh_price_data(chain_code: str | int, store_code: str | int, parallel: bool = False,
+                           urls: dict | None = None) -> SnapshotHandle | None:
+    """
+    Fetch fresh data for the given chain and store code - handle of the snapshot shared by all sessions
+    parallel=True parses the file in the process pool - used when several stores are fetched together
+    urls - price URLs already resolved for the store (e.g. by prices_many), otherwise resolved here
+    """
     # Get the supermarket chain class from its chain code
-    chain = next((c for c in SupermarketChain.registry if c.chain_code == str(chain_code)), None)
+    chain = get_chain(chain_code)
     # Get the latest price URLs for the given chain and store code
-    urls = await chain.safe_prices(store_code=store_code) if chain and store_code else None
+    if not urls:
+        urls = await chain.safe_prices(store_code=store_code) if chain and store_code else None
     if urls:
         # Use pricefull URL and cookies if available
         url = urls.get('pricefull') or urls.get('PriceFull') if urls else None
         cookies = urls.get('cookies', None) if urls else None
-        # Make data dict from data in pricefull URL
-        price_dict = await data_dict(url=url, cookies=cookies) if url else None
+        if not url:
+            return None
+        # Same file already parsed for another session → share it
+        key = snapshot_key('prices', chain_code, store_code, url)
+        handle = shared_snapshot(key)
+        if handle is not None:
+            return handle
+        # Make list of items from data in pricefull URL
+        price_dict = await data_items(url=url, kind='prices', cookies=cookies, parallel=parallel,
+                                      lineage=session_code(chain_code, store_code))
         # Clean data dict to only include dicts of items
         price_data = chain.get_price_data(price_data=price_dict) if price_dict else None
-        return price_data
+        return share_snapshot(key, price_data) if price_data else None
     else:
         raise RuntimeError(f"No price URLs found for chain {chain_code} and store {store_code}.")
 
 
 # @st.cache_data(ttl=1800)
-async def fresh_promo_data(chain_code: str | int, store_code: str | int, ) -> dict | None:
-    """ Fetch fresh data for the given chain and store code """
-    # Get the supermarket chain class from its alias
-    chain = next((c for c in SupermarketChain.registry if c.chain_code == str(chain_code)), None)
+async def fresh_promo_data(chain_code: str | int, store_code: str | int, ) -> SnapshotHandle | None:
+    """ Fetch fresh data for the given chain and store code - handle of the snapshot shared by all sessions """
+    # Get the supermarket chain class from its chain code
+    chain = get_chain(chain_code)
     # Get the latest price URLs for the given chain and store code
     urls = await chain.safe_prices(store_code=store_code) if chain and store_code else None
     if urls:
         # Use promofull URL and cookies if available
         url = urls.get('promofull') or urls.get('PromoFull') if urls else None
         cookies = urls.get('cookies', None) if urls else None
-        # Make data dict from data in pricefull URL
-        promo_dict = await data_dict(url=url, cookies=cookies) if url else None
+        if not url:
+            return None
+        # Same file already parsed for another session → share it
+        key = snapshot_key('promos', chain_code, store_code, url)
+        handle = shared_snapshot(key)
+        if handle is not None:
+            return handle
+        # Make list of promotions from data in promofull URL
+        promo_dict = await data_items(url=url, kind='promos', cookies=cookies,
+                                      lineage=session_code(chain_code, store_code))
         # Clean data dict to only include dicts of items
         promo_data = chain.get_promo_data(promo_data=promo_dict) if promo_dict else None
-        return promo_data
+        return share_snapshot(key, promo_data) if promo_data else None
     else:
         raise RuntimeError(f"No promo URLs found for chain {chain_code} and store {store_code}.")
 
 
 async def shopping_data(chain_code: str | int, store_code: str | int):
-    """ Get price and promo data for selected store and enter into session_state """
+    """
+    Get price and promo data for selected store - {session_state key: data} to be entered into session_state
+    by the calling script (coroutines run on the backend loop thread, without the session)
+    """
     # Key to store data in session_state
     session_key = session_code(chain_code=chain_code, store_code=store_code)
 
@@ -61,14 +86,13 @@ async def shopping_data(chain_code: str | int, store_code: str | int):
         price_data = price_task.result()
         promo_data = promo_task.result()
 
-        # Enter price and promo data into session_state
-        if price_data:
-            force_value_into_session_state(f'{session_key}_price_data', price_data)
-        else:
+        # Price and promo data for session_state - only the handles, the data is shared
+        if not price_data:
             raise RuntimeError("No data returned from selected chain.")
-        # Enter promo data into session_state
+        values = {f'{session_key}_price_data': price_data}
         if promo_data:
-            force_value_into_session_state(f'{session_key}_promo_data', promo_data)
+            values[f'{session_key}_promo_data'] = promo_data
+        return values
     except Exception as e:
         print(f"ERROR in shopping_data: {type(e).__name__}: {e}")
         import traceback
@@ -78,13 +102,22 @@ async def shopping_data(chain_code: str | int, store_code: str | int):
 
 async def planning_data(stores_list: list[dict]):
     """
-    Getting price data from all selected stores.
+    Getting price data from all selected stores - {session_state key: data} to be entered into session_state
+    by the calling script.
     Each store represented by dict:
         {chain_code: 123,
         chain_alias: some_chain_name,
         store_code: 456,
         store_name: some_store_name}
     """
+    # Resolve price URLs of all stores chain by chain - one listing pass per chain
+    chain_stores = {}
+    for item in stores_list:
+        chain_stores.setdefault(str(item['chain_code']), []).append(item['store_code'])
+    chains = {code: chain for code in chain_stores if (chain := get_chain(code))}
+    resolved = await asyncio.gather(*(chain.prices_many(chain_stores[code]) for code, chain in chains.items()))
+    chain_urls = dict(zip(chains, resolved))
+
     try:
         # Get price data for all selected stores
         async with asyncio.TaskGroup() as tg:
@@ -92,7 +125,9 @@ async def planning_data(stores_list: list[dict]):
                 tg.create_task(
                     fresh_price_data(
                         chain_code=item['chain_code'],
-                        store_code=item['store_code']
+                        store_code=item['store_code'],
+                        parallel=True,  # Parse stores in parallel processes
+                        urls=chain_urls.get(str(item['chain_code']), {}).get(str(item['store_code'])),
                     )
                 )
                 for item in stores_list
@@ -103,7 +138,6 @@ async def planning_data(stores_list: list[dict]):
     # Get results of all the tasks
     results = [task.result() for task in tasks]
 
-    # Enter price data (results) into session stage
-    for idx, item in enumerate(stores_list):
-        session_key = f'{item['chain_code']}_{item['store_code']}'
-        st.session_state[session_key] = results[idx]
+    # Price data (results) for session state - snapshot handles, the data is shared by all sessions
+    return {session_code(item['chain_code'], item['store_code']): result
+            for item, result in zip(stores_list, results)}
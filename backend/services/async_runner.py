@@ -1,33 +1,20 @@
 import httpx
-import asyncio
 import streamlit as st
 
+from backend.utilities.backend_loop import run_on_backend_loop
+
 
 def run_async(coro, key: str = None, *args, **kwargs):
     """
     coro - name of async function (without () )
-    Run an async coroutine in a synchronous context.
+    Run an async coroutine in a synchronous context - on the long-lived backend loop, shared by all
+    sessions and reruns (pooled clients and the browser stay open between reruns).
     Store result in session state if key is provided.
     """
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
     # Always create the coroutine object first
     coro_obj = coro(*args, **kwargs)
-
-    async def wrapper():
-        """ Wrapper to run coroutine  """
-        result = await coro_obj
-        if key:
-            st.session_state[key] = result
-        return result
-
-    if loop.is_running():
-        asyncio.create_task(wrapper())
-        return None
-    else:
-        return loop.run_until_complete(wrapper())
-
+    # Wait in the script thread - session_state is only available here, not on the backend loop
+    result = run_on_backend_loop(coro_obj)
+    if key:
+        st.session_state[key] = result
+    return result
@@ -6,6 +6,7 @@ from backend.db.models import Store
 from backend.db.connection import get_session
 from backend.db.create_db import insert_new_stores
 from backend.core.super_class import SupermarketChain
+from backend.core.registry import load_chains
 
 
 # UPDATE STORES DATA IN DB ##############
@@ -40,8 +41,11 @@ async def update_stores_db():
             return await update_chain_stores_db(chain)
     # Dict to hold results
     results = {}
-    # Get list of all classes
-    chains = SupermarketChain.registry
+    # Get list of all classes (imports all chain adapters)
+    chains = load_chains()
+    # List files of all PublishedPrices chains in one browser first - their stores() then reuse the listings
+    from backend.core.publishedprices import PublishedPrices
+    await PublishedPrices.sweep([chain for chain in chains if issubclass(chain, PublishedPrices)])
 
     try:
         # Make TaskGroup of tasks where each task is getting stores url (and cookies) for chain and updating db
@@ -13,6 +13,12 @@ def force_value_into_session_state(key_name: str, value: Any):
     st.session_state[key_name] = value
 
 
+def force_values_into_session_state(values: dict[str, Any] | None):
+    """ Function to enter all key / value pairs into streamlit session_state overwriting existing values """
+    for key_name, value in (values or {}).items():
+        st.session_state[key_name] = value
+
+
 def get_value_from_session_state(key_name: str) -> Any | None:
     """ Function to get value from streamlit session_state """
     if key_name in st.session_state:
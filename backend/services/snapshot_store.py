@@ -0,0 +1,118 @@
+""" Process-wide store of parsed price / promo lists - one shared copy per store file for all sessions """
+
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any
+
+from backend.utilities.file_catalog import parse_file_url
+
+
+# Snapshots no session refers to are kept (for the next user of the store) up to this number, oldest dropped first
+SNAPSHOT_CAPACITY = 32
+
+
+def snapshot_key(kind: str, chain_code: str | int, store_code: str | int, url: str) -> tuple:
+    """ Key of a parsed file - (kind, chain code, store code, file timestamp or the url if it has none) """
+    record = parse_file_url(url)
+    return kind, str(chain_code), str(store_code), record.timestamp if record else url
+
+
+class SnapshotHandle(Sequence):
+    """
+    Reference to a shared snapshot - a read only sequence of the parsed items.
+    The snapshot is released when the handle is released or garbage collected (e.g. replaced in session_state).
+    Items are shared between sessions and must not be modified.
+    """
+    def __init__(self, store: 'SnapshotStore', key: tuple, data: tuple):
+        self.key = key
+        self.data = data
+        self._finalizer = weakref.finalize(self, store._release, key)
+
+    def release(self):
+        """ Release the snapshot now - later calls do nothing """
+        self._finalizer()
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __repr__(self) -> str:
+        return f'SnapshotHandle({self.key!r}, {len(self.data)} items)'
+
+
+class SnapshotStore:
+    """
+    Immutable parsed data keyed by snapshot_key, shared by all sessions of the process.
+    Each handle holds a reference - referenced snapshots are never evicted, the others are evicted
+    least recently used first when there are more than capacity snapshots.
+    Streamlit runs sessions in threads, so all access is under a threading lock.
+    """
+    def __init__(self, capacity: int = SNAPSHOT_CAPACITY):
+        self.capacity = capacity
+        self._entries = OrderedDict()  # key -> [data, reference count]
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> SnapshotHandle | None:
+        """ Handle of the snapshot - None if not in the store """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry[1] += 1
+            self._entries.move_to_end(key)
+            return SnapshotHandle(self, key, entry[0])
+
+    def put(self, key: tuple, data: list[Any]) -> SnapshotHandle:
+        """ Store data under the key and return its handle - if already stored (concurrent parse) the stored copy """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [tuple(data), 0]
+            entry[1] += 1
+            self._entries.move_to_end(key)
+            self._evict()
+            return SnapshotHandle(self, key, entry[0])
+
+    def stats(self) -> dict:
+        """ Number of snapshots, referenced snapshots and items held """
+        with self._lock:
+            return {'snapshots': len(self._entries),
+                    'referenced': sum(1 for _, refs in self._entries.values() if refs),
+                    'items': sum(len(data) for data, _ in self._entries.values())}
+
+    def _release(self, key: tuple):
+        """ Drop one reference of the snapshot (called by the handle finalizer) """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] -= 1
+                self._evict()
+
+    def _evict(self):
+        """ Drop unreferenced snapshots, least recently used first, down to capacity - lock must be held """
+        excess = len(self._entries) - self.capacity
+        if excess <= 0:
+            return
+        for key in [key for key, (_, refs) in self._entries.items() if refs <= 0][:excess]:
+            del self._entries[key]
+
+
+# One store per process
+_store = SnapshotStore()
+
+
+def shared_snapshot(key: tuple) -> SnapshotHandle | None:
+    """ Handle of the shared snapshot - None if not stored """
+    return _store.get(key)
+
+
+def share_snapshot(key: tuple, data: list[Any]) -> SnapshotHandle:
+    """ Share data under the key and return its handle """
+    return _store.put(key, data)
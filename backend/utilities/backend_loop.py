@@ -0,0 +1,71 @@
+import asyncio
+import atexit
+import threading
+from typing import Awaitable, Callable
+
+
+# Seconds each shutdown hook may take at interpreter exit
+SHUTDOWN_TIMEOUT = 10
+
+_loop: asyncio.AbstractEventLoop | None = None
+_thread: threading.Thread | None = None
+_lock = threading.Lock()
+_shutdown_hooks = []  # async callables awaited on the backend loop at exit (close clients, browser ...)
+
+
+def backend_loop() -> asyncio.AbstractEventLoop:
+    """
+    The one long-lived event loop of the process, running on a daemon thread.
+    All coroutines of the app run on it (see run_async), so pooled clients, the browser and the
+    other per-loop state are created once and shared by all sessions and script reruns.
+    """
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=loop.run_forever, name='backend-loop', daemon=True)
+            _thread.start()
+            _loop = loop
+            atexit.register(shutdown)
+        return _loop
+
+
+def on_backend_thread() -> bool:
+    """ True when called from the backend loop thread """
+    return _thread is not None and threading.current_thread() is _thread
+
+
+def run_on_backend_loop(coro: Awaitable):
+    """ Run coroutine on the backend loop and wait for its result in the calling thread """
+    if on_backend_thread():
+        raise RuntimeError("run_on_backend_loop() called from the backend loop - await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, backend_loop()).result()
+
+
+async def in_backend_loop(coro: Awaitable):
+    """ Await coroutine on the backend loop from any event loop - for state bound to the backend loop (browser) """
+    loop = backend_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def register_shutdown(hook: Callable[[], Awaitable[None]]):
+    """ Register async hook awaited on the backend loop at interpreter exit """
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+
+
+def shutdown():
+    """ Await the shutdown hooks on the backend loop, then stop it """
+    global _loop
+    with _lock:
+        loop, _loop = _loop, None
+    if loop is None or not loop.is_running():
+        return
+    for hook in reversed(_shutdown_hooks):
+        try:
+            asyncio.run_coroutine_threadsafe(hook(), loop).result(timeout=SHUTDOWN_TIMEOUT)
+        except Exception as e:
+            print(f"Error in shutdown hook {getattr(hook, '__name__', hook)}: {e}")
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+from backend.utilities.backend_loop import backend_loop, register_shutdown
+
+
+# Logged in sessions (context + cookies) are reused this long before logging in again
+SESSION_TTL = 20 * 60  # Seconds
+HEADLESS = True
+# Pages open at the same time in the shared browser (logins, fallback listings) - bounds browser memory
+MAX_PAGES = 4
+
+
+class BrowserSession:
+    """ Logged in browser context of one credential and its cookies (requests-compatible dict) """
+    def __init__(self, context: BrowserContext, pages: asyncio.Semaphore):
+        self.context = context
+        self.pages = pages
+        self.cookies = {}
+        self.expires = 0.0
+
+    @property
+    def fresh(self) -> bool:
+        """ True while the login can be reused """
+        return time.monotonic() < self.expires
+
+    async def refresh_cookies(self, ttl: float = SESSION_TTL):
+        """ Read cookies from the context and set expiry - TTL or the earliest cookie expiry if sooner """
+        cookies = await self.context.cookies()
+        self.cookies = {c['name']: c['value'] for c in cookies if 'name' in c and 'value' in c}
+        # Playwright expires is unix time, -1 for session cookies
+        expiries = [c['expires'] - time.time() for c in cookies if c.get('expires', -1) > 0]
+        self.expires = time.monotonic() + min([ttl, *expiries])
+
+    @asynccontextmanager
+    async def page(self):
+        """ Yield a new page of the logged in context - closed afterwards, the context stays """
+        async with self.pages:
+            page = await self.context.new_page()
+            try:
+                yield page
+            finally:
+                await page.close()
+
+
+class BrowserManager:
+    """
+    Keeps one headless Chromium and a logged in context per credential (login url, username).
+    Contexts are isolated (own cookies and storage), so all chains share the one browser process
+    and log in concurrently - at most MAX_PAGES pages at a time.
+    Playwright objects are bound to the event loop that created them, so the one manager of the process
+    lives on the backend loop (see backend_loop) and is closed by its shutdown hook.
+    """
+    def __init__(self):
+        self.playwright = None
+        self.browser: Browser | None = None
+        self.sessions = {}  # (url, username) -> BrowserSession
+        self.locks = {}  # (url, username) -> asyncio.Lock - concurrent callers log in only once
+        self.pages = asyncio.Semaphore(MAX_PAGES)
+        self._start_lock = asyncio.Lock()
+
+    async def get_browser(self) -> Browser:
+        """ Return the running browser, starting it on first use or after a crash """
+        async with self._start_lock:
+            if self.browser is None or not self.browser.is_connected():
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(headless=HEADLESS)
+                # Contexts of the old browser are gone
+                self.sessions.clear()
+        return self.browser
+
+    async def session(self, url: str, username: str, login: Callable[[Page], Awaitable[None]],
+                      ttl: float = SESSION_TTL) -> BrowserSession:
+        """
+        Return logged in session for the credential - login(page) is awaited only when there is no session
+        yet or it has expired.
+        """
+        key = (url, username)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            session = self.sessions.get(key)
+            if session is not None and session.fresh and self.browser is not None and self.browser.is_connected():
+                return session
+
+            if session is not None:
+                await self._close_context(session)
+            browser = await self.get_browser()
+            session = BrowserSession(await browser.new_context(), self.pages)
+            try:
+                async with session.page() as page:
+                    await login(page)
+                await session.refresh_cookies(ttl)
+            except BaseException:
+                await self._close_context(session)
+                raise
+            self.sessions[key] = session
+            return session
+
+    async def invalidate(self, url: str, username: str):
+        """ Drop the session of the credential - e.g. when the portal logged it out before the TTL """
+        session = self.sessions.pop((url, username), None)
+        if session is not None:
+            await self._close_context(session)
+
+    @staticmethod
+    async def _close_context(session: BrowserSession):
+        """ Close context, ignoring a browser that is already gone """
+        try:
+            await session.context.close()
+        except Exception:
+            pass
+
+    async def aclose(self):
+        """ Close all contexts, the browser and playwright """
+        sessions = list(self.sessions.values())
+        self.sessions.clear()
+        for session in sessions:
+            await self._close_context(session)
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+
+# The one manager of the process - used on the backend loop only
+_manager: BrowserManager | None = None
+
+
+def get_browser_manager() -> BrowserManager:
+    """ Return the browser manager of the process - must be called on the backend loop (see in_backend_loop) """
+    global _manager
+    if asyncio.get_running_loop() is not backend_loop():
+        raise RuntimeError("Browser sessions live on the backend loop - run the caller with in_backend_loop()")
+    if _manager is None:
+        _manager = BrowserManager()
+    return _manager
+
+
+async def browser_session(url: str, username: str, login: Callable[[Page], Awaitable[None]],
+                          ttl: float = SESSION_TTL) -> BrowserSession:
+    """ Logged in browser session for the credential, shared by all sessions of the process """
+    return await get_browser_manager().session(url, username, login, ttl)
+
+
+async def close_browsers():
+    """ Shutdown hook - close the browser and playwright driver """
+    global _manager
+    manager, _manager = _manager, None
+    if manager is not None:
+        await manager.aclose()
+
+
+# Close the browser of the backend loop at exit
+register_shutdown(close_browsers)
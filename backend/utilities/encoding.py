@@ -0,0 +1,63 @@
+import codecs
+import re
+
+import chardet
+
+
+# Bytes looked at when resolving the encoding - never the whole file
+SAMPLE_SIZE = 64 * 1024
+# chardet is slow - last resort on a small sample only
+CHARDET_SAMPLE_SIZE = 4 * 1024
+
+# UTF-32 before UTF-16 - the UTF-32-LE BOM starts with the UTF-16-LE BOM
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+XML_DECLARATION = re.compile(rb'^\s*<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
+
+
+def codec_name(name: str | None) -> str | None:
+    """ Normalized python codec name or None if unknown """
+    try:
+        return codecs.lookup(name).name if name else None
+    except LookupError:
+        return None
+
+
+def declared_encoding(data: bytes) -> str | None:
+    """ Encoding the document states itself - BOM or XML declaration """
+    for bom, name in BOMS:
+        if data.startswith(bom):
+            return name
+    match = XML_DECLARATION.match(data[:1024])
+    return codec_name(match.group(1).decode('ascii')) if match else None
+
+
+def is_utf8(sample: bytes) -> bool:
+    """ True if sample is valid UTF-8 (a character cut at the end of the sample is allowed) """
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(data: bytes) -> str:
+    """
+    Resolve encoding of XML bytes: BOM → XML declaration → UTF-8 check on a sample → chardet on a few KB.
+    Only the start of data is looked at, so this is fast on any file size.
+    """
+    encoding = declared_encoding(data)
+    if encoding:
+        return encoding
+
+    sample = data[:SAMPLE_SIZE]
+    if is_utf8(sample):
+        return 'utf-8'
+
+    detected = chardet.detect(sample[:CHARDET_SAMPLE_SIZE])
+    return codec_name(detected.get('encoding')) or 'utf-8'
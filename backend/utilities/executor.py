@@ -0,0 +1,61 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# CPU-bound work (decompression, XML parsing, hashing...) runs here instead of on the event loop.
+# 'thread' keeps everything in one process, 'process' parses several files in parallel on all cores.
+EXECUTOR_KIND = 'thread'
+MAX_WORKERS = None  # None → executor default (based on number of cores)
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def configure_executor(kind: str = 'thread', max_workers: int | None = None):
+    """ Set executor kind ('thread' or 'process') and size for CPU-bound work """
+    global EXECUTOR_KIND, MAX_WORKERS
+    if kind not in ('thread', 'process'):
+        raise ValueError(f"Unknown executor kind: {kind}")
+    shutdown_executors()
+    EXECUTOR_KIND, MAX_WORKERS = kind, max_workers
+
+
+def get_executor(kind: str | None = None) -> Executor:
+    """ Return (and create on first use) the executor of given kind - default is the configured kind """
+    kind = kind or EXECUTOR_KIND
+    with _lock:
+        executor = _executors.get(kind)
+        if executor is None:
+            if kind == 'process':
+                # spawn - forking a process that runs threads (streamlit sessions) is not safe
+                executor = ProcessPoolExecutor(max_workers=MAX_WORKERS,
+                                               mp_context=multiprocessing.get_context('spawn'))
+            else:
+                executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='cpu')
+            _executors[kind] = executor
+    return executor
+
+
+async def run_blocking(func, *args, process_safe: bool = True, executor_kind: str | None = None, **kwargs):
+    """
+    Await func(*args, **kwargs) running in the configured executor, so the event loop keeps serving
+    other downloads and sessions meanwhile.
+    process_safe=False for calls with arguments / results that cannot be pickled (open files...) -
+    these always run in the thread executor.
+    executor_kind overrides the configured kind ('process' to parse in parallel on all cores).
+    """
+    kind = executor_kind if process_safe else 'thread'
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(kind), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors(wait: bool = True):
+    """ Shut down all executors - they are created again on next use """
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
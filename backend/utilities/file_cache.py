@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+# Every chain file name carries a timestamp, so the content behind a URL never changes
+# and can be cached on disk by URL. Parsed results are stored by hash of the decompressed content, so files
+# republished unchanged under a new name are parsed once. Least recently used entries are deleted above MAX_CACHE_BYTES.
+# Parsed results are pickled, so the cache is a private directory of the app user (not the shared temp dir) -
+# COMPRICEZZ_CACHE_DIR overrides the location
+CACHE_DIR = os.environ.get('COMPRICEZZ_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'compricezz',
+)
+MAX_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+# Entries used this recently are never evicted - a file just opened may still be hashed / parsed by its path
+EVICT_GRACE = 10 * 60  # Seconds
+# Wait this long before scanning again when a scan could not get under MAX_CACHE_BYTES (all entries recent or pinned)
+EVICT_RETRY = 60  # Seconds
+
+# File names with a timestamp - 20251108-100919, 202511081009, 20251108100919 ...
+TIMESTAMP_PATTERN = re.compile(r'\d{8}-?\d{4,6}')
+# Signed blob storage URLs get a fresh signature (query string) on every listing
+SIGNED_HOSTS = ('.blob.core.windows.net', )
+# Entries kept in the hash lineage of a store
+LINEAGE_LENGTH = 50
+
+
+def normalize_url(url: str) -> str:
+    """ Normalize url so the same file always gets the same cache key """
+    parts = urlsplit(url.strip().replace('\\', '/'))
+    netloc = parts.netloc.lower()
+    # Drop default ports
+    if (parts.scheme == 'https' and netloc.endswith(':443')) or (parts.scheme == 'http' and netloc.endswith(':80')):
+        netloc = netloc.rsplit(':', 1)[0]
+    # Signature changes but content does not → ignore query for signed urls, otherwise sort query params
+    query = '' if netloc.endswith(SIGNED_HOSTS) else urlencode(sorted(parse_qsl(parts.query)))
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path, query, ''))
+
+
+def is_cacheable(url: str) -> bool:
+    """ Only timestamped file names are immutable """
+    file_name = urlsplit(url).path.rsplit('/', 1)[-1]
+    return bool(TIMESTAMP_PATTERN.search(file_name))
+
+
+def cache_key(url: str) -> str:
+    """ Return cache key for url """
+    return hashlib.sha1(normalize_url(url).encode()).hexdigest()
+
+
+def raw_path(url: str) -> str:
+    """ Path of the raw (still compressed) downloaded file """
+    return os.path.join(CACHE_DIR, f'{cache_key(url)}.raw')
+
+
+def parsed_path(url: str, kind: str = 'dict') -> str:
+    """ Path of the reference from url to its parsed snapshot - kind separates different parsers of the same file """
+    return os.path.join(CACHE_DIR, f'{cache_key(url)}.{kind}.ref')
+
+
+def snapshot_path(digest: str, kind: str = 'dict') -> str:
+    """ Path of the parsed result of a file content - files republished unchanged share one snapshot """
+    return os.path.join(CACHE_DIR, f'snap-{digest}.{kind}.pkl')
+
+
+def lineage_path(key: str) -> str:
+    """ Path of the hash lineage of a store """
+    return os.path.join(CACHE_DIR, f'lineage-{hashlib.sha1(key.encode()).hexdigest()}.json')
+
+
+_cache_dir_ready = False
+_cache_bytes = None  # Estimated cache size - one directory scan at first write, then kept up to date
+_pinned = {}  # path -> number of readers using the file by path (never evicted)
+_next_scan = 0.0  # time.monotonic() before which writes over the limit do not scan again
+_state_lock = threading.Lock()
+
+
+def cache_dir_ready() -> bool:
+    """
+    Create the cache dir (mode 0700) and check it is a directory of the current user that others cannot write to -
+    cached pickles are only read and written when it is.
+    """
+    global _cache_dir_ready
+    if _cache_dir_ready:
+        return True
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        info = os.lstat(CACHE_DIR)
+        if not stat.S_ISDIR(info.st_mode):
+            print(f"Cache disabled: {CACHE_DIR} is not a directory")
+            return False
+        if hasattr(os, 'getuid'):
+            if info.st_uid != os.getuid():
+                print(f"Cache disabled: {CACHE_DIR} is owned by another user")
+                return False
+            if info.st_mode & 0o077:
+                os.chmod(CACHE_DIR, 0o700)
+    except OSError as e:
+        print(f"Cache disabled: {e}")
+        return False
+    _cache_dir_ready = True
+    return True
+
+
+def _touch(path: str):
+    """ Mark entry as recently used """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def pinned(path: str | None):
+    """ Keep the cache file from eviction while it is used by path (None does nothing) """
+    if path is None:
+        yield
+        return
+    with _state_lock:
+        _pinned[path] = _pinned.get(path, 0) + 1
+    try:
+        yield
+    finally:
+        with _state_lock:
+            _pinned[path] -= 1
+            if not _pinned[path]:
+                del _pinned[path]
+
+
+def _added(size: int):
+    """
+    Count bytes written to the cache - evict only when the estimate is over MAX_CACHE_BYTES,
+    at most once per EVICT_RETRY while eviction cannot get under it
+    """
+    global _cache_bytes
+    with _state_lock:
+        scan = _cache_bytes is None
+        if not scan:
+            _cache_bytes += size
+            scan = _cache_bytes > MAX_CACHE_BYTES and time.monotonic() >= _next_scan
+    if scan:
+        evict()
+
+
+def _atomic_write(path: str, write) -> bool:
+    """
+    Write to temp file in cache dir and move into place - concurrent readers never see partial files.
+    Return False (nothing written) if the cache dir is not usable.
+    """
+    if not cache_dir_ready():
+        return False
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _added(size)
+    return True
+
+
+def open_raw(url: str) -> IO[bytes] | None:
+    """ Return open raw cached file for url or None """
+    if not is_cacheable(url) or not cache_dir_ready():
+        return None
+    path = raw_path(url)
+    try:
+        file = open(path, 'rb')
+    except OSError:
+        return None
+    _touch(path)
+    return file
+
+
+def put_raw(url: str, file: IO[bytes]) -> str | None:
+    """ Copy downloaded file into cache and return its path (None if url is not cacheable) """
+    if not is_cacheable(url):
+        return None
+    path = raw_path(url)
+    file.seek(0)
+    written = _atomic_write(path, lambda f: shutil.copyfileobj(file, f))
+    file.seek(0)
+    return path if written else None
+
+
+def get_parsed(url: str, kind: str = 'dict') -> Any | None:
+    """ Return cached parsed result for url or None """
+    if not is_cacheable(url) or not cache_dir_ready():
+        return None
+    path = parsed_path(url, kind)
+    try:
+        with open(path) as f:
+            digest = f.read().strip()
+    except OSError:
+        return None
+    _touch(path)
+    return get_snapshot(digest, kind)
+
+
+def put_parsed(url: str, digest: str, kind: str = 'dict'):
+    """ Point url to the snapshot of its content (stored with put_snapshot) """
+    if not is_cacheable(url):
+        return
+    _atomic_write(parsed_path(url, kind), lambda f: f.write(digest.encode()))
+
+
+def get_snapshot(digest: str, kind: str = 'dict') -> Any | None:
+    """ Return parsed result of the content with given hash or None """
+    if not cache_dir_ready():
+        return None
+    path = snapshot_path(digest, kind)
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    _touch(path)
+    return data
+
+
+def put_snapshot(digest: str, data: Any, kind: str = 'dict'):
+    """ Store parsed result of the content with given hash """
+    if data is None:
+        return
+    _atomic_write(snapshot_path(digest, kind), lambda f: pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def get_lineage(key: str) -> list[dict]:
+    """ Hash lineage of a store - [{'url', 'hash', 'kind', 'time'}, ...] oldest first """
+    if not cache_dir_ready():
+        return []
+    try:
+        with open(lineage_path(key), 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def add_lineage(key: str, url: str, digest: str, kind: str = 'dict') -> bool:
+    """
+    Record that url of the store (key) has content digest - return True if the content is unchanged
+    since the previous file of the same kind.
+    """
+    lineage = get_lineage(key)
+    previous = next((entry for entry in reversed(lineage) if entry['kind'] == kind), None)
+    if previous is not None and previous['url'] == url:
+        return True  # Same file again
+    lineage.append({'url': url, 'hash': digest, 'kind': kind, 'time': time.time()})
+    lineage = lineage[-LINEAGE_LENGTH:]
+    _atomic_write(lineage_path(key), lambda f: f.write(json.dumps(lineage).encode()))
+    return previous is not None and previous['hash'] == digest
+
+
+def evict(max_bytes: int | None = None):
+    """
+    Delete least recently used cache files until cache size is under max_bytes.
+    Pinned files and files used within EVICT_GRACE are kept.
+    """
+    global _cache_bytes, _next_scan
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.is_file() and not e.name.endswith('.tmp')]
+    except OSError:
+        return
+    stats = []
+    for e in entries:
+        try:
+            stats.append((e.stat().st_mtime, e.stat().st_size, e.path))
+        except OSError:
+            continue  # Deleted by another session
+    total = sum(size for _, size, _ in stats)
+    recent = time.time() - EVICT_GRACE
+    for mtime, size, path in sorted(stats):
+        if total <= max_bytes or mtime > recent:
+            break
+        with _state_lock:
+            if path in _pinned:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        total -= size
+    with _state_lock:
+        _cache_bytes = total
+        _next_scan = time.monotonic() + EVICT_RETRY if total > max_bytes else 0.0
+
+
+def clear():
+    """ Delete the whole cache """
+    global _cache_dir_ready, _cache_bytes, _next_scan
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    _cache_dir_ready = False
+    _cache_bytes = None
+    _next_scan = 0.0
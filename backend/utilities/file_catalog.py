@@ -0,0 +1,138 @@
+import bisect
+import re
+from datetime import datetime
+from typing import Iterable, NamedTuple
+from urllib.parse import urlsplit
+
+
+# Canonical file types - adapters map them to the keys their prices() returns
+FILE_TYPES = ('price', 'pricefull', 'promo', 'promofull', 'stores')
+
+# Price / promo / stores file name of any chain:
+#   PriceFull7290027600007-001-202511080300.gz, PromoFull7290700100008-000-002-20251101-100000.gz,
+#   Stores7290055700007-000-20251101-050000.xml ...
+# → type, chain code, store code (last number before the date), date, time
+FILE_NAME = re.compile(
+    r'^(PriceFull|Price|PromoFull|Promo|Stores?)(\d+)(?:-\d+)*?-(\d+)-(\d{8})-?(\d{4,6})?(?:\D|$)',
+    re.IGNORECASE,
+)
+
+
+class FileRecord(NamedTuple):
+    """ One listed file of a chain - parsed once when the listing is read """
+    timestamp: datetime
+    url: str
+    chain: str
+    store: int | None
+    file_type: str
+
+
+def parse_timestamp(date: str, time: str | None = None) -> datetime:
+    """ YYYYMMDD with optional HHMM / HHMMSS → datetime """
+    time = (time or '').ljust(6, '0')
+    return datetime.strptime(date + time, '%Y%m%d%H%M%S')
+
+
+def file_type_name(name: str) -> str:
+    """ Canonical file type of a file name prefix - 'PriceFull' → 'pricefull', 'Store' → 'stores' """
+    name = name.lower()
+    return 'stores' if name.startswith('store') else name
+
+
+def parse_file_url(url: str, chain: str = '', pattern: re.Pattern = FILE_NAME) -> FileRecord | None:
+    """
+    Parse file url into a FileRecord - None if the file name does not match.
+    pattern must have the groups: type, chain code, store code, date, time (FILE_NAME) or
+    type, store code, date, time (chains with their own pattern).
+    """
+    path = urlsplit(url).path.replace('\\', '/')
+    name = path.rsplit('/', 1)[-1]
+    match = pattern.search(name) or pattern.search(path)
+    if not match:
+        return None
+    groups = match.groups()
+    file_type, store, date, time = (groups[0], *groups[-3:])
+    try:
+        return FileRecord(parse_timestamp(date, time), url, chain, int(store), file_type_name(file_type))
+    except ValueError:
+        return None
+
+
+class FileCatalog:
+    """
+    Files of one chain, kept sorted by timestamp per (store, file type):
+    latest file of a type in O(1), file as of a given time in O(log n).
+    """
+    def __init__(self, records: Iterable[FileRecord] = ()):
+        self._records = {}  # (store, file type) -> list of FileRecord sorted by timestamp
+        self._urls = set()
+        self.extend(records)
+
+    def add(self, record: FileRecord):
+        """ Add a record - the same url is added only once """
+        if record.url in self._urls:
+            return
+        self._urls.add(record.url)
+        records = self._records.setdefault((record.store, record.file_type), [])
+        if not records or records[-1].timestamp <= record.timestamp:
+            records.append(record)  # Listings are mostly in time order
+        else:
+            bisect.insort(records, record, key=lambda r: r.timestamp)
+
+    def extend(self, records: Iterable[FileRecord]):
+        """ Add many records (None entries - unparsable files - are skipped) """
+        for record in records:
+            if record is not None:
+                self.add(record)
+
+    def latest(self, store: int | str | None, file_type: str) -> FileRecord | None:
+        """ Latest file of the type for the store """
+        records = self._records.get((self._store(store), file_type))
+        return records[-1] if records else None
+
+    def as_of(self, store: int | str | None, file_type: str, when: datetime) -> FileRecord | None:
+        """ Latest file of the type for the store published at or before when """
+        records = self._records.get((self._store(store), file_type))
+        if not records:
+            return None
+        i = bisect.bisect_right(records, when, key=lambda r: r.timestamp)
+        return records[i - 1] if i else None
+
+    def latest_urls(self, store: int | str, names: dict[str, str]) -> dict[str, str | None]:
+        """ Latest url per file type for the store - names maps result key -> canonical file type """
+        result = {}
+        for key, file_type in names.items():
+            record = self.latest(store, file_type)
+            result[key] = record.url if record else None
+        return result
+
+    def records(self, store: int | str | None = None, file_type: str | None = None) -> list[FileRecord]:
+        """ Records for the store and / or file type (all if not given), oldest first per (store, type) """
+        store = self._store(store)
+        return [record for (s, t), records in self._records.items()
+                if (store is None or s == store) and (file_type is None or t == file_type)
+                for record in records]
+
+    def stores(self) -> set[int]:
+        """ Store codes with files """
+        return {store for store, _ in self._records if store is not None}
+
+    def prune(self, before: datetime):
+        """ Drop records older than before """
+        for key, records in list(self._records.items()):
+            i = bisect.bisect_left(records, before, key=lambda r: r.timestamp)
+            for record in records[:i]:
+                self._urls.discard(record.url)
+            del records[:i]
+            if not records:
+                del self._records[key]
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._urls
+
+    @staticmethod
+    def _store(store: int | str | None) -> int | None:
+        return int(store) if store is not None else None
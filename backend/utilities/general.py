@@ -1,15 +1,10 @@
 import streamlit as st
-from backend.core.super_class import SupermarketChain
+from backend.core.registry import get_chain
 
 
 def get_chain_from_code(chain_code):
-    """ Get chain object from chain code """
-    # List of all registered supermarket chains
-    chains = SupermarketChain.registry
-    # Get chain matching given chain code
-    chain = next(c for c in chains if c.chain_code == chain_code)
-
-    return chain
+    """ Get chain object from chain code (its adapter module is imported on first use) """
+    return get_chain(chain_code)
 
 
 def session_code(chain_code: str | int, store_code: str | int) -> str:
@@ -0,0 +1,146 @@
+import asyncio
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import httpx
+
+from backend.utilities.backend_loop import register_shutdown
+
+
+# Pool settings used for every client created by the manager (see configure_clients)
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+TIMEOUT = httpx.Timeout(60.0)
+MAX_CLIENTS = 32  # Max number of (host, cookie scope) clients kept alive per event loop
+
+
+def configure_clients(max_connections: int | None = None, max_keepalive_connections: int | None = None,
+                      keepalive_expiry: float | None = None, timeout: float | None = None,
+                      max_clients: int | None = None):
+    """
+    Change pool settings for clients created from now on.
+    Clients that are already open keep their settings until closed.
+    """
+    global POOL_LIMITS, TIMEOUT, MAX_CLIENTS
+    POOL_LIMITS = httpx.Limits(
+        max_connections=max_connections or POOL_LIMITS.max_connections,
+        max_keepalive_connections=max_keepalive_connections or POOL_LIMITS.max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry or POOL_LIMITS.keepalive_expiry,
+    )
+    TIMEOUT = httpx.Timeout(timeout) if timeout else TIMEOUT
+    MAX_CLIENTS = max_clients or MAX_CLIENTS
+
+
+def host_key(url: str) -> str:
+    """ Return scheme://host[:port] of url - one pool is kept per portal host """
+    parts = urlsplit(url)
+    return f'{parts.scheme.lower()}://{parts.netloc.lower()}'
+
+
+def cookie_scope(cookies: dict[str, str] | None) -> tuple:
+    """ Make hashable scope key from cookies - clients with different credentials never share a jar """
+    return tuple(sorted(cookies.items())) if cookies else ()
+
+
+class RequestCookiesOnly(DefaultCookiePolicy):
+    """ Cookie policy that never stores cookies set by responses - pooled clients are shared by all sessions """
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+
+class ClientManager:
+    """
+    Keeps one long-lived keep-alive httpx.AsyncClient per (portal host, cookie scope).
+    httpx clients are bound to the event loop that created them, so there is one manager per loop -
+    the app runs all coroutines on the one backend loop (see backend_loop), so in practice one per process.
+    Clients send only the cookies of their scope - cookies set by the portals are not kept between requests.
+    """
+    def __init__(self):
+        self.clients = OrderedDict()  # (host, scope) -> httpx.AsyncClient, least recently used first
+        self.leases = {}  # (host, scope) -> number of requests currently using the client
+        self.closing = set()  # aclose() tasks of evicted clients - referenced until done
+
+    def _new_client(self, cookies: dict[str, str] | None) -> httpx.AsyncClient:
+        """ Create client with the configured pool limits """
+        client = httpx.AsyncClient(
+            verify=False,
+            cookies=CookieJar(policy=RequestCookiesOnly()),
+            timeout=TIMEOUT,
+            limits=POOL_LIMITS,
+        )
+        if cookies:
+            client.cookies.update(cookies)
+        return client
+
+    def _evict(self):
+        """ Close least recently used idle clients when there are too many """
+        for key in list(self.clients.keys()):
+            if len(self.clients) <= MAX_CLIENTS:
+                break
+            if self.leases.get(key):
+                continue  # In use - never close under a running request
+            client = self.clients.pop(key)
+            self.leases.pop(key, None)
+            task = asyncio.get_running_loop().create_task(client.aclose())
+            self.closing.add(task)
+            task.add_done_callback(self.closing.discard)
+
+    @asynccontextmanager
+    async def lease(self, url: str, cookies: dict[str, str] | None = None):
+        """ Yield the pooled client for url host and cookies, creating it on first use """
+        key = (host_key(url), cookie_scope(cookies))
+        client = self.clients.get(key)
+        if client is None or client.is_closed:
+            client = self.clients[key] = self._new_client(cookies)
+        self.clients.move_to_end(key)
+        self.leases[key] = self.leases.get(key, 0) + 1
+        try:
+            yield client
+        finally:
+            self.leases[key] -= 1
+            self._evict()
+
+    async def aclose(self):
+        """ Close all clients of this manager """
+        clients = list(self.clients.values())
+        self.clients.clear()
+        self.leases.clear()
+        for client in clients:
+            await client.aclose()
+        if self.closing:
+            await asyncio.gather(*self.closing, return_exceptions=True)
+
+
+# One manager per event loop - dropped automatically when the loop is garbage collected
+_managers = weakref.WeakKeyDictionary()
+
+
+def get_client_manager() -> ClientManager:
+    """ Return the client manager of the running event loop """
+    loop = asyncio.get_running_loop()
+    manager = _managers.get(loop)
+    if manager is None:
+        manager = _managers[loop] = ClientManager()
+    return manager
+
+
+def pooled_client(url: str, cookies: dict[str, str] | None = None):
+    """
+    Async context manager yielding the shared client for url and cookies:
+        async with pooled_client(url) as client:
+            ...
+    """
+    return get_client_manager().lease(url, cookies)
+
+
+async def close_clients():
+    """ Shutdown hook - close all pooled clients of the running event loop """
+    manager = _managers.pop(asyncio.get_running_loop(), None)
+    if manager is not None:
+        await manager.aclose()
+
+
+# Close the clients of the backend loop at exit
+register_shutdown(close_clients)
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import httpx
+
+from backend.utilities.http_client import host_key
+
+
+# Default limits per portal host (see configure_host for per-host overrides)
+RATE = 10.0  # Requests per second (token bucket refill rate)
+BURST = 20  # Token bucket size
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+LATENCY_TARGET = 20.0  # Seconds - slower time to response headers counts as congestion
+LATENCY_SAMPLES = 200  # Recent latencies kept per host
+
+_host_settings = {}  # host -> dict of limiter kwargs
+
+
+class Outcome:
+    """ Result of one request - set by the caller inside HostLimiter.slot() """
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+        self.error = None
+        self.start = time.monotonic()
+        self.latency = None  # Seconds to the response headers - streamed bodies are not part of it
+
+    def record_response(self, response: httpx.Response):
+        """ Keep status code, Retry-After and time to headers of response """
+        if self.latency is None:
+            self.latency = time.monotonic() - self.start
+        self.status = response.status_code
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            self.retry_after = float(retry_after)
+
+    def record_error(self, error: Exception):
+        """ Keep network error (timeout, connection reset...) """
+        self.error = error
+
+    @property
+    def congested(self) -> bool:
+        """ 429 / 5xx / timeouts and transport errors mean the portal is overloaded """
+        if isinstance(self.error, httpx.TransportError):
+            return True
+        return self.status is not None and (self.status == 429 or self.status >= 500)
+
+
+class HostLimiter:
+    """
+    Token bucket (request rate) combined with AIMD adaptive concurrency for one portal host.
+    Concurrency grows by about one per window of healthy responses and halves on 429/5xx/timeouts.
+    Shared by all event loops (sessions) of the process.
+    """
+    def __init__(self, rate: float = RATE, burst: int = BURST, initial_concurrency: int = INITIAL_CONCURRENCY,
+                 min_concurrency: int = MIN_CONCURRENCY, max_concurrency: int = MAX_CONCURRENCY,
+                 latency_target: float = LATENCY_TARGET):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.active = 0
+        self.waiters = deque()  # (loop, future) waiting for a concurrency slot
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def _take_token(self) -> float:
+        """ Take a token if available - return 0, otherwise seconds to wait (call with lock held) """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def _wake(self):
+        """ Wake waiters for free concurrency slots (call with lock held) """
+        free = int(self.limit) - self.active
+        while free > 0 and self.waiters:
+            loop, future = self.waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+                free -= 1
+            except RuntimeError:
+                continue  # Loop already closed
+
+    async def acquire(self):
+        """ Wait for a concurrency slot and a token """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self.active < int(self.limit):
+                    self.active += 1
+                    break
+                future = loop.create_future()
+                self.waiters.append((loop, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, future) in self.waiters:
+                        self.waiters.remove((loop, future))
+                    else:
+                        self._wake()  # Pass the wake up on
+                raise
+
+        try:
+            while True:
+                with self._lock:
+                    wait = self._take_token()
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+        except BaseException:
+            with self._lock:
+                self.active -= 1
+                self._wake()
+            raise
+
+    def release(self, latency: float, outcome: Outcome):
+        """ Free slot and adapt concurrency to the outcome of the request """
+        with self._lock:
+            self.active -= 1
+            self.latencies.append(latency)
+            if outcome.congested or latency > self.latency_target:
+                # Multiplicative decrease
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                if outcome.retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + outcome.retry_after)
+            elif outcome.error is None:
+                # Additive increase
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Limit a request to the host:
+            async with limiter.slot() as outcome:
+                response = await client.get(url)
+                outcome.record_response(response)
+        """
+        await self.acquire()
+        outcome = Outcome()
+        try:
+            yield outcome
+        except Exception as e:
+            outcome.record_error(e)
+            raise
+        finally:
+            # Time to headers - a long body download is not congestion. Without a response: time to the failure
+            latency = outcome.latency if outcome.latency is not None else time.monotonic() - outcome.start
+            self.release(latency, outcome)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_host(url: str, **settings):
+    """ Override limiter settings (rate, burst, max_concurrency...) for the host of url """
+    host = host_key(url)
+    with _limiters_lock:
+        _host_settings[host] = settings
+        _limiters.pop(host, None)
+
+
+def limiter_for(url: str) -> HostLimiter:
+    """ Return the limiter of the url host - one per host for the whole process """
+    host = host_key(url)
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = HostLimiter(**_host_settings.get(host, {}))
+    return limiter
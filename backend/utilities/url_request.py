@@ -1,4 +1,32 @@
 import httpx
+import asyncio
+import io
+import re
+import tempfile
+import time
+import zlib
+from collections import deque
+from typing import IO
+
+from backend.utilities.executor import run_blocking
+from backend.utilities.http_client import pooled_client, host_key
+from backend.utilities.rate_limit import limiter_for
+
+
+# Streamed downloads are kept in memory up to SPOOL_MAX_SIZE bytes and then rolled over to a temp file on disk
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# Broken downloads are resumed from where they stopped - at most this many requests per file
+DOWNLOAD_ATTEMPTS = 3
+CONTENT_RANGE = re.compile(r'bytes (?:(\d+)-\d+|\*)/(\d+|\*)')
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Hedged requests - a duplicate is sent if no answer within the p95 latency of earlier hedged requests to the host
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # Below that the default budget is used
+HEDGE_DEFAULT_BUDGET = 10.0
+HEDGE_MIN_BUDGET = 1.0
+_hedge_latencies = {}  # host -> recent latencies of hedged (listing) requests
 
 
 async def url_request(
@@ -8,9 +36,10 @@ async def url_request(
     payload: dict | None = None,
     headers: dict[str, str] | None = None,
     client: httpx.AsyncClient | None = None,
+    hedge: bool = False,
 ) -> dict:
     """
-    Use client provided or create a new client and make an async HTTP request (GET or POST)
+    Use client provided or the pooled client for the url host and make an async HTTP request (GET or POST)
     and safely return content or an error message.
 
     :param url: The URL to request.
@@ -19,42 +48,261 @@ async def url_request(
     :param payload: Data to send in POST body.
     :param headers: Optional request headers.
     :param client: Optional pre-configured httpx.AsyncClient.
+    :param hedge: Send a duplicate request if the first is slower than usual (idempotent listing requests only).
     :return: {'response': content} or {'Error': message}.
     """
-    # Reuse existing client if provided, otherwise create a new one
-    owns_client = client is None
-
-    if owns_client:
-        client = httpx.AsyncClient(
-            verify=False,
-            cookies=cookies,
-            timeout=httpx.Timeout(60.0),
+    if hedge:
+        return await hedged(
+            lambda: url_request(url, cookies=cookies, method=method, payload=payload, headers=headers, client=client),
+            url,
         )
 
-    else:
-        # shared client → do NOT modify cookie jar if cookies is None
-        if cookies:
-            client.cookies.update(cookies)
+    # No client provided → use long-lived pooled client for host and cookies (never closed here)
+    if client is None:
+        async with pooled_client(url, cookies) as pooled:
+            return await send_request(pooled, url, method=method, payload=payload, headers=headers)
+
+    # shared client → do NOT modify cookie jar if cookies is None
+    if cookies:
+        client.cookies.update(cookies)
+    return await send_request(client, url, method=method, payload=payload, headers=headers)
+
+
+def hedge_budget(url: str) -> float:
+    """ Seconds to wait before sending a duplicate - p95 of recent hedged request latencies to the host """
+    latencies = sorted(_hedge_latencies.get(host_key(url), ()))
+    if len(latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_BUDGET
+    return max(HEDGE_MIN_BUDGET, latencies[int(HEDGE_QUANTILE * (len(latencies) - 1))])
+
 
+async def hedged(make_request, url: str) -> dict:
+    """
+    Run make_request() and, if it has not answered within the host budget, run it again.
+    First successful response wins and the other request is cancelled.
+    """
+    latencies = _hedge_latencies.setdefault(host_key(url), deque(maxlen=200))
+    budget = hedge_budget(url)
+
+    async def timed() -> dict:
+        start = time.monotonic()
+        try:
+            result = await make_request()
+        except asyncio.CancelledError:
+            # Lost to the other attempt or abandoned - its latency is at least the time it ran (censored sample),
+            # and a request still running at the budget took at least the budget
+            latencies.append(max(time.monotonic() - start, budget))
+            raise
+        if 'Error' not in result:
+            latencies.append(time.monotonic() - start)
+        return result
+
+    tasks = [asyncio.ensure_future(timed())]
     try:
-        if method.upper() == "POST":
-            response = await client.post(url, data=payload, headers=headers, )
-        else:
-            response = await client.get(url, headers=headers, )
-
-        response.raise_for_status()
-        return {"response": response.content}
-
-    except httpx.HTTPStatusError as e:
-        return {"Error": f"HTTP error: {e.response.status_code} - {e.response.text}"}
-    except httpx.RequestError as e:
-        # return {"Error": f"Request error: {str(e)}"}
-        return {
-            "Error": repr(e),
-            "Type": type(e).__name__
-        }
+        done, _ = await asyncio.wait(tasks, timeout=budget)
+        if not done:
+            tasks.append(asyncio.ensure_future(timed()))
 
+        result = None
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if 'Error' not in result:
+                return result
+        # Both failed - return last error
+        return result
     finally:
-        if owns_client:
-            await client.aclose()
+        for task in tasks:
+            task.cancel()
+
+
+async def send_request(
+    client: httpx.AsyncClient,
+    url: str,
+    method: str = "GET",
+    payload: dict | None = None,
+    headers: dict[str, str] | None = None,
+) -> dict:
+    """
+    Make the request with the given client and return {'response': content} or {'Error': message}
+    Requests are throttled by the rate limiter of the url host.
+    """
+    async with limiter_for(url).slot() as outcome:
+        try:
+            if method.upper() == "POST":
+                response = await client.post(url, data=payload, headers=headers, )
+            else:
+                response = await client.get(url, headers=headers, )
 
+            outcome.record_response(response)
+            response.raise_for_status()
+            return {"response": response.content}
+
+        except httpx.HTTPStatusError as e:
+            return {"Error": f"HTTP error: {e.response.status_code} - {e.response.text}"}
+        except httpx.RequestError as e:
+            outcome.record_error(e)
+            # return {"Error": f"Request error: {str(e)}"}
+            return {
+                "Error": repr(e),
+                "Type": type(e).__name__
+            }
+
+
+async def url_stream(
+    url: str = None,
+    cookies: dict[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+    client: httpx.AsyncClient | None = None,
+) -> dict:
+    """
+    Stream a GET request into a spooled temp file, so memory use does not depend on file size.
+    The caller owns the returned file and must close it.
+
+    :param url: The URL to download.
+    :param cookies: Optional cookies dictionary.
+    :param headers: Optional request headers.
+    :param client: Optional pre-configured httpx.AsyncClient.
+    :return: {'response': file-like positioned at 0} or {'Error': message}.
+    """
+    if client is None:
+        async with pooled_client(url, cookies) as pooled:
+            return await stream_to_spool(pooled, url, headers=headers)
+
+    if cookies:
+        client.cookies.update(cookies)
+    return await stream_to_spool(client, url, headers=headers)
+
+
+async def stream_to_spool(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict[str, str] | None = None,
+) -> dict:
+    """
+    Write response body chunk by chunk into a SpooledTemporaryFile - throttled by the host rate limiter.
+    A download broken off partway is resumed from the bytes already written (HTTP Range) instead of
+    starting over, at most DOWNLOAD_ATTEMPTS times per file. The result is checked against the length
+    announced by the server, or - if there is none - against the gzip trailer.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    result = {}
+    for _ in range(DOWNLOAD_ATTEMPTS):
+        result = await stream_attempt(client, url, spool, headers)
+        if 'Error' in result:
+            if result.pop('retry'):
+                continue
+            break
+
+        if await download_complete(spool, result['total']):
+            spool.seek(0)
+            return {"response": spool}
+        result = {
+            "Error": f"Incomplete download: {spool.seek(0, io.SEEK_END)} of {result['total']} bytes",
+            "Type": "IncompleteDownload",
+        }
+
+    spool.close()
+    result.pop('retry', None)
+    return result
+
+
+def content_range(value: str | None) -> tuple[int | None, int | None]:
+    """ (first byte, total length) of a Content-Range header like 'bytes 100-199/200' or 'bytes */200' (416) """
+    match = CONTENT_RANGE.match(value or '')
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return int(start) if start else None, int(total) if total != '*' else None
+
+
+async def stream_attempt(
+    client: httpx.AsyncClient,
+    url: str,
+    spool: IO[bytes],
+    headers: dict[str, str] | None = None,
+) -> dict:
+    """
+    One GET appending the body to spool - with a Range request for the rest if spool already holds data.
+    Return {'total': expected length or None} or {'Error': message, 'retry': bool}.
+    """
+    offset = spool.seek(0, io.SEEK_END)
+    # No HTTP compression - byte ranges and Content-Length then refer to the file itself
+    request_headers = {**(headers or {}), 'Accept-Encoding': 'identity'}
+    if offset:
+        request_headers['Range'] = f'bytes={offset}-'
+
+    async with limiter_for(url).slot() as outcome:
+        try:
+            async with client.stream("GET", url, headers=request_headers) as response:
+                outcome.record_response(response)
+                if offset and response.status_code == 416:
+                    # Nothing left to send - the previous attempt got everything
+                    return {"total": content_range(response.headers.get('Content-Range'))[1]}
+                if response.is_error:
+                    # Body is needed for the error message
+                    await response.aread()
+                response.raise_for_status()
+
+                start, total = content_range(response.headers.get('Content-Range'))
+                if response.status_code != 206 or start != offset:
+                    # Server sent the whole file (Range not supported) → start over
+                    spool.seek(0)
+                    spool.truncate()
+                    length = response.headers.get('Content-Length')
+                    total = int(length) if length and length.isdigit() else None
+                    if response.status_code == 206:
+                        return {"Error": f"Unexpected range: {response.headers.get('Content-Range')}",
+                                "retry": True}
+
+                # Chunks as received - nothing is held back and lost if the connection breaks
+                async for chunk in response.aiter_bytes():
+                    spool.write(chunk)
+
+            return {"total": total}
+
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            return {
+                "Error": f"HTTP error: {status} - {e.response.text}",
+                "retry": status == 429 or status >= 500,
+            }
+        except httpx.RequestError as e:
+            outcome.record_error(e)
+            return {
+                "Error": repr(e),
+                "Type": type(e).__name__,
+                "retry": isinstance(e, httpx.TransportError),
+            }
+
+
+async def download_complete(spool: IO[bytes], total: int | None) -> bool:
+    """ Check the spool holds the whole file - by length if known, else by the gzip trailer """
+    size = spool.seek(0, io.SEEK_END)
+    if total is not None:
+        return size == total
+    spool.seek(0)
+    if spool.read(2) != GZIP_MAGIC:
+        return True  # Nothing to check against
+    return await run_blocking(gzip_complete, spool, process_safe=False)
+
+
+def gzip_complete(file: IO[bytes]) -> bool:
+    """
+    True if file is a complete gzip stream - zlib checks the CRC and size in the trailer of every member.
+    Output is discarded, nothing is kept in memory.
+    """
+    file.seek(0)
+    decompressor = zlib.decompressobj(wbits=31)
+    try:
+        while chunk := file.read(CHUNK_SIZE):
+            decompressor.decompress(chunk)
+            # Concatenated members - start a new decompressor on the rest
+            while decompressor.eof and decompressor.unused_data:
+                rest = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=31)
+                decompressor.decompress(rest)
+        return decompressor.eof
+    except zlib.error:
+        return False
+    finally:
+        file.seek(0)
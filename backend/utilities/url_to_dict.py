@@ -3,120 +3,288 @@ import xmltodict
 import io
 import gzip
 import zipfile
-import chardet
-import re
+import codecs
+import xxhash
+from typing import IO
 
-from backend.utilities.url_request import url_request
+from backend.utilities.url_request import url_request, url_stream
+from backend.utilities import file_cache
+from backend.utilities.encoding import SAMPLE_SIZE, declared_encoding, detect_encoding
+from backend.utilities.executor import run_blocking
+from backend.utilities.xml_parser import parse_price_items, parse_promo_items, to_columns, from_columns
 
 
 async def download_url(url: str, cookies: dict[str, str] | None = None,
-                       client: httpx.AsyncClient | None = None) -> bytes | dict:
-    """ Function to get the content of the specified URL """
+                       client: httpx.AsyncClient | None = None, stream: bool = False) -> bytes | IO[bytes] | dict:
+    """
+    Function to get the content of the specified URL
+    stream=True spools the download to a temp file and returns the open file (caller closes it)
+    """
+    request = url_stream if stream else url_request
     try:
         # Download the file
         if client is not None:
-            response = await url_request(url, client=client)
+            response = await request(url, client=client)
         else:
-            response = await url_request(url, cookies=cookies, )
+            response = await request(url, cookies=cookies, )
         return response['response']
 
     except Exception as e:
         return {"error": str(e)}
 
 
-async def extract_xml_bytes(file_bytes: bytes) -> bytes:
+def open_xml_stream(file: IO[bytes]) -> IO[bytes]:
     """
-    Detect whether file_bytes is gzip, zip, or plain XML,
-    and return the extracted XML bytes.
+    Return a stream of the XML inside a seekable binary file (gzip, zip or plain XML).
+    Data is decompressed while it is read, so the decompressed XML is never held in memory as a whole.
     """
-    # If structured data / str
-    if isinstance(file_bytes, str):
-        # Detect encoding
-        detected = chardet.detect(file_bytes.encode())  # fallback
-        encoding = detected['encoding'] or 'utf-8'
-        print('encoding:', encoding)
-        file_bytes = file_bytes.encode(encoding)
+    magic = file.read(4)
+    file.seek(0)
 
     # GZIP magic number
-    if file_bytes[:2] == b"\x1f\x8b":
-        return gzip.decompress(file_bytes)
+    if magic[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=file, mode="rb")
 
     # ZIP magic number
-    if file_bytes[:4] == b"PK\x03\x04":
-        with zipfile.ZipFile(io.BytesIO(file_bytes)) as z:
-            # Pick the first XML file inside the ZIP
-            for name in z.namelist():
-                if name.lower().endswith(".xml"):
-                    return z.read(name)
-            raise ValueError("No XML file found inside ZIP archive")
+    if magic == b"PK\x03\x04":
+        z = zipfile.ZipFile(file)
+        # Pick the first XML file inside the ZIP
+        for name in z.namelist():
+            if name.lower().endswith(".xml"):
+                return z.open(name)
+        raise ValueError("No XML file found inside ZIP archive")
 
     # Otherwise, assume it's already plain XML
-    return file_bytes
+    return file
 
 
-def sanitize_xml(xml_bytes: bytes) -> str:
+async def open_url_file(url: str, cookies: dict[str, str] | None = None,
+                        client: httpx.AsyncClient | None = None) -> IO[bytes] | dict:
     """
-    Sanitize malformed XML content before parsing.
-    Fixes:
-      - spaces in closing/opening tags
-      - stray ampersands (&)
-      - text beyond </Root>
-      - UTF BOMs
+    Return open raw file for url (caller closes it) - from the file cache if present,
+    otherwise a streamed download that is stored in the cache.
     """
-    # Detect encoding
-    detected = chardet.detect(xml_bytes)
-    encoding = detected.get('encoding', 'utf-8')
-    text = xml_bytes.decode(encoding, errors='ignore')
+    cached = await run_blocking(file_cache.open_raw, url, process_safe=False)
+    if cached is not None:
+        return cached
+
+    # Stream the download into a spooled temp file instead of holding the whole archive in memory
+    if client is not None:
+        downloaded_content = await download_url(url=url, client=client, stream=True)
+    else:
+        downloaded_content = await download_url(url=url, cookies=cookies, stream=True)
+    if hasattr(downloaded_content, 'read'):
+        await run_blocking(file_cache.put_raw, url, downloaded_content, process_safe=False)
+        # Continue from the cache file - a file on disk can be parsed in another process
+        cached = await run_blocking(file_cache.open_raw, url, process_safe=False)
+        if cached is not None:
+            downloaded_content.close()
+            return cached
+    return downloaded_content
+
+
+class SubChainFixStream(io.RawIOBase):
+    """
+    Inserts missing </SubChain> before </SubChains> (a defect of some chains' store files)
+    while the XML stream is read.
+    """
+    CLOSE = b'</SubChain>'
+    CLOSE_ALL = b'</SubChains>'
+
+    def __init__(self, raw: IO[bytes]):
+        self.raw = raw
+        self.fix = None  # Decided at first </SubChain> or </SubChains> - None until then
+        self.tail = b''  # Possibly incomplete tag carried over to the next chunk
+        self.out = b''
+        self.pos = 0
+        self.eof = False
+
+    def readable(self) -> bool:
+        return True
 
-    # Remove BOM if present
-    text = text.replace("\ufeff", "")
+    def _process(self, data: bytes) -> bytes:
+        """ Fix only if </SubChain> is missing before </SubChains> """
+        if self.fix is None:
+            close = data.find(self.CLOSE)
+            close_all = data.find(self.CLOSE_ALL)
+            if close != -1 and (close_all == -1 or close < close_all):
+                self.fix = False
+            elif close_all != -1:
+                self.fix = True
+        if self.fix:
+            data = data.replace(self.CLOSE_ALL, self.CLOSE + self.CLOSE_ALL)
+        return data
 
-    # Fix invalid tag spacing
-    text = re.sub(r'<(\w+)\s+>', r'<\1>', text)
-    text = re.sub(r'</(\w+)\s+>', r'</\1>', text)
+    def readinto(self, b) -> int:
+        while self.pos >= len(self.out) and not self.eof:
+            chunk = self.raw.read(64 * 1024)
+            if not chunk:
+                self.eof = True
+                data, self.tail = self.tail, b''
+            else:
+                data = self.tail + chunk
+                # Never split a tag between chunks
+                cut = data.rfind(b'<')
+                if cut == -1 or len(data) - cut > len(self.CLOSE_ALL):
+                    cut = len(data)
+                data, self.tail = data[:cut], data[cut:]
+            self.out = self._process(data)
+            self.pos = 0
 
-    # Escape stray ampersands
-    text = re.sub(r'&(?!amp;|lt;|gt;|quot;|apos;)', '&amp;', text)
+        n = min(len(b), len(self.out) - self.pos)
+        b[:n] = self.out[self.pos:self.pos + n]
+        self.pos += n
+        return n
 
-    # Truncate anything after </Root>
-    match = re.search(r'</Root>', text)
-    if match:
-        text = text[:match.end()]
+    def close(self):
+        self.raw.close()
+        super().close()
 
-    return text
+
+def recode_chunks(xml_stream: IO[bytes], encoding: str, chunk_size: int = 64 * 1024):
+    """ Yield the stream recoded to UTF-8 chunk by chunk """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while chunk := xml_stream.read(chunk_size):
+        yield decoder.decode(chunk).encode('utf-8')
+    yield decoder.decode(b'', final=True).encode('utf-8')
+
+
+def parse_dict(xml_stream: IO[bytes], encoding: str | None = None) -> dict:
+    """ xmltodict parse of stream - expat only knows UTF-8/16 and Latin-1, so other encodings are recoded to UTF-8 """
+    if encoding and encoding not in ('utf-8', 'utf-8-sig', 'ascii'):
+        return xmltodict.parse(recode_chunks(xml_stream, encoding), encoding='utf-8')
+    return xmltodict.parse(xml_stream, encoding=encoding)
+
+
+# Parsers by kind of result - 'dict' is the full document, 'prices' / 'promos' are projected item lists
+PARSERS = {
+    'dict': parse_dict,
+    'prices': parse_price_items,
+    'promos': parse_promo_items,
+}
+
+
+def parse_source(source: str | IO[bytes], kind: str = 'dict', fix_subchain: bool = False) -> dict | list[dict]:
+    """
+    Decompress and parse source (file path or open binary file) with the parser of given kind.
+    Blocking - runs in the CPU executor. The source file is closed when done.
+    """
+    file = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        # Decompression feeds the parser directly - decompressed XML is never materialized
+        xml_stream = open_xml_stream(file)
+        if fix_subchain:
+            xml_stream = SubChainFixStream(xml_stream)
+        # Resolve encoding from the start of the stream only when the document does not declare it
+        xml_stream = io.BufferedReader(xml_stream, buffer_size=SAMPLE_SIZE)
+        sample = xml_stream.peek(SAMPLE_SIZE)
+        encoding = None if declared_encoding(sample) else detect_encoding(sample)
+        return PARSERS[kind](xml_stream, encoding)
+    finally:
+        file.close()
 
 
-async def fix_missing_subchain(xml_bytes: bytes) -> bytes:
+def content_hash(source: str | IO[bytes]) -> str:
     """
-    Insert missing </SubChain> before </SubChains> if it's missing.
-    Returns bytes ready for xmltodict or ET parsing.
+    Fast hash (xxh3) of the decompressed XML - a file republished unchanged under a new name
+    (and new gzip header) hashes the same. An open file is rewound, a path is opened and closed.
     """
-    # Decode bytes (detect UTF BOM or fallback to utf-8)
-    xml_text = xml_bytes.decode('utf-8-sig')  # removes BOM if present
+    file = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        hasher = xxhash.xxh3_64()
+        xml_stream = open_xml_stream(file)
+        while chunk := xml_stream.read(SAMPLE_SIZE):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+    finally:
+        if isinstance(source, str):
+            file.close()
+        else:
+            file.seek(0)
 
-    # Check if </SubChain> exists before </SubChains>
-    if '</SubChain>' not in xml_text.split('</SubChains>')[0]:
-        # Insert the missing closing tag
-        xml_text = xml_text.replace('</SubChains>', '</SubChain></SubChains>')
 
-    # Return as bytes
-    return xml_text.encode('utf-8')
+def parse_source_columns(source: str, kind: str = 'prices', fix_subchain: bool = False) -> dict[str, list]:
+    """ parse_source returning columns - compact result to send back from a worker process """
+    return to_columns(parse_source(source, kind, fix_subchain))
 
 
-async def data_dict(url: str, cookies: dict[str, str] | None = None,
-                    client: httpx.AsyncClient | None = None) -> dict:
-    """ Function to extract data to dict from the specified URL file"""
-    if client is not None:
-        downloaded_content = await download_url(url=url, client=client)
-    else:
-        downloaded_content = await download_url(url=url, cookies=cookies, )
-    xml_bytes = await extract_xml_bytes(downloaded_content)
+async def parse_url(url: str, kind: str = 'dict', cookies: dict[str, str] | None = None,
+                    client: httpx.AsyncClient | None = None, parallel: bool = False,
+                    lineage: str | None = None) -> dict | list[dict]:
+    """
+    Download (or read from cache) the URL file and parse it with the parser of given kind
+    parallel=True parses item lists in the process pool, so several stores parse at the same time on all cores
+    Content already parsed under another url (same hash) is not parsed again.
+    lineage - key of the store (session_code) to record the content hash of each of its files
+    """
+    # Same url → same file, reuse parsed result
+    cached = await run_blocking(file_cache.get_parsed, url, kind, process_safe=False)
+    if cached is not None:
+        return cached
+
+    downloaded_content = await open_url_file(url=url, cookies=cookies, client=client)
+    if not hasattr(downloaded_content, 'read'):
+        raise RuntimeError(f"Download failed for {url}: {downloaded_content}")
+
+    fix_subchain = 'hazihinam' in url.lower()
+    path = getattr(downloaded_content, 'name', None)
+    path = path if isinstance(path, str) else None
+    # Cache file is hashed and parsed by path - keep it from eviction until done
+    with file_cache.pinned(path):
+        digest, result = await hash_and_parse(downloaded_content, path, kind, fix_subchain, parallel)
+
+    await run_blocking(file_cache.put_parsed, url, digest, kind, process_safe=False)
+    if lineage:
+        await run_blocking(file_cache.add_lineage, lineage, url, digest, kind, process_safe=False)
+    return result
 
-    if 'hazihinam' in url.lower():
-        xml_bytes = await fix_missing_subchain(xml_bytes)
 
+async def hash_and_parse(downloaded_content: IO[bytes], path: str | None, kind: str, fix_subchain: bool,
+                         parallel: bool) -> tuple[str, dict | list[dict]]:
+    """ Content hash of the downloaded file and its parsed result - from the snapshot of the hash if present """
     try:
-        return xmltodict.parse(xml_bytes)
+        if isinstance(path, str):
+            # File on disk - pass the path, so hashing and parsing may run in a worker process
+            downloaded_content.close()
+            digest = await run_blocking(content_hash, path)
+        else:
+            digest = await run_blocking(content_hash, downloaded_content, process_safe=False)
+
+        # Republished file with unchanged content → reuse snapshot, costs only the download
+        result = await run_blocking(file_cache.get_snapshot, digest, kind, process_safe=False)
+        if result is None:
+            if isinstance(path, str) and parallel and kind != 'dict':
+                # Worker process parses the file on disk and sends back columns instead of many dicts
+                columns = await run_blocking(parse_source_columns, path, kind, fix_subchain, executor_kind='process')
+                # Rebuilding the records is CPU work too - off the event loop
+                result = await run_blocking(from_columns, columns, process_safe=False)
+            elif isinstance(path, str):
+                result = await run_blocking(parse_source, path, kind, fix_subchain)
+            else:
+                result = await run_blocking(parse_source, downloaded_content, kind, fix_subchain,
+                                            process_safe=False)
+            await run_blocking(file_cache.put_snapshot, digest, result, kind, process_safe=False)
     except Exception as e:
         print("XML parsing failed:", e)
         raise
+    finally:
+        downloaded_content.close()
+    return digest, result
+
+
+async def data_dict(url: str, cookies: dict[str, str] | None = None,
+                    client: httpx.AsyncClient | None = None, lineage: str | None = None) -> dict:
+    """ Function to extract data to dict from the specified URL file"""
+    return await parse_url(url, kind='dict', cookies=cookies, client=client, lineage=lineage)
+
+
+async def data_items(url: str, kind: str = 'prices', cookies: dict[str, str] | None = None,
+                     client: httpx.AsyncClient | None = None, parallel: bool = False,
+                     lineage: str | None = None) -> list[dict]:
+    """
+    Function to extract list of items from the specified URL price file (kind='prices')
+    or list of promotions from promo file (kind='promos') - only fields used by the app, prices as float
+    parallel=True parses in the process pool (used when many stores are parsed at once)
+    lineage - store key (session_code) under which the content hash of the file is recorded
+    """
+    return await parse_url(url, kind=kind, cookies=cookies, client=client, parallel=parallel, lineage=lineage)
@@ -0,0 +1,165 @@
+import sys
+from typing import IO, Callable
+
+from lxml import etree
+
+
+# Fields kept from PriceFull items - everything else in the file is dropped while parsing
+PRICE_FIELDS = (
+    'ItemCode', 'ItemId', 'ItemType', 'ItemName', 'ItemNm', 'ManufacturerName', 'ManufacturerItemDescription',
+    'Manufacturer', 'Brand', 'BrandName', 'ItemPrice', 'UnitOfMeasurePrice', 'Quantity', 'UnitOfMeasure',
+    'bIsWeighted', 'QtyInPackage', 'AllowDiscount', 'ItemStatus', 'PriceUpdateDate',
+)
+# Fields kept from PromoFull promotions - nested fields (PromotionItems, Clubs...) keep their structure
+PROMO_FIELDS = (
+    'PromotionId', 'PromotionDescription', 'PromotionStartDate', 'PromotionStartHour', 'PromotionEndDate',
+    'PromotionEndHour', 'RewardType', 'DiscountType', 'DiscountRate', 'DiscountedPrice', 'DiscountedPricePerMida',
+    'MinQty', 'MaxQty', 'MinPurchaseAmnt', 'MinNoOfItemOfered', 'AllowMultipleDiscounts', 'IsWeightedPromo',
+    'Clubs', 'AdditionalRestrictions', 'PromotionItems', 'Remarks',
+)
+# Fields converted to float
+FLOAT_FIELDS = {'ItemPrice', 'UnitOfMeasurePrice', 'DiscountedPrice', 'DiscountedPricePerMida', 'MinPurchaseAmnt'}
+# Fields with few distinct values - values are interned, so thousands of items share one string object
+SHARED_VALUE_FIELDS = {
+    'ItemType', 'ManufacturerName', 'Manufacturer', 'Brand', 'BrandName', 'Quantity', 'UnitOfMeasure',
+    'bIsWeighted', 'QtyInPackage', 'AllowDiscount', 'ItemStatus', 'RewardType', 'DiscountType', 'ClubId',
+    'MinQty', 'MaxQty', 'AllowMultipleDiscounts', 'IsWeightedPromo', 'PromotionEndDate', 'PromotionStartDate',
+}
+
+# Record element -> element names it may be nested in (Root/Items/Item, root/Items/Item, Products/Product ...)
+PRICE_RECORDS = {'Item': ('Items', ), 'Product': ('Products', )}
+PROMO_RECORDS = {'Promotion': ('Promotions', ), 'Sale': ('Sales', )}
+
+
+def local_name(el) -> str:
+    """ Tag without namespace - asx:abap style files use namespaced elements """
+    tag = el.tag
+    if not isinstance(tag, str):
+        return ''
+    # Interned - every record shares the same key objects
+    return sys.intern(tag.rsplit('}', 1)[-1] if '}' in tag else tag)
+
+
+def typed(name: str, text: str | None):
+    """ Strip text and convert price fields to float """
+    if text is None:
+        return None
+    text = text.strip()
+    if not text:
+        return None
+    if name in FLOAT_FIELDS:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+    if name in SHARED_VALUE_FIELDS:
+        return sys.intern(text)
+    return text
+
+
+def element_to_dict(el):
+    """ Convert element to xmltodict-like structure - text for leaves, dict for children, list for repeated """
+    children = list(el)
+    if not children:
+        return typed(local_name(el), el.text)
+
+    result = {}
+    for child in children:
+        name = local_name(child)
+        if not name:
+            continue  # Comments / processing instructions
+        value = element_to_dict(child)
+        if name in result:
+            if not isinstance(result[name], list):
+                result[name] = [result[name]]
+            result[name].append(value)
+        else:
+            result[name] = value
+    return result
+
+
+def field_name(child, fields: dict[str, str]) -> str | None:
+    """ Canonical (shared) field name of child if it is a wanted field """
+    tag = child.tag
+    name = fields.get(tag)
+    if name is None and isinstance(tag, str) and '}' in tag:
+        name = fields.get(tag.rsplit('}', 1)[-1])
+    return name
+
+
+def flat_record(el, fields: dict[str, str]) -> dict:
+    """ Price item - only the wanted fields, one level deep """
+    record = {}
+    for child in el:
+        name = field_name(child, fields)
+        if name is not None:
+            record[name] = typed(name, child.text)
+    return record
+
+
+def nested_record(el, fields: dict[str, str]) -> dict:
+    """ Promotion - only the wanted fields, nested fields converted like xmltodict """
+    record = {}
+    for child in el:
+        name = field_name(child, fields)
+        if name is not None:
+            record[name] = element_to_dict(child)
+    return record
+
+
+def iter_records(source: IO[bytes] | str, records: dict[str, tuple], fields: tuple,
+                 make_record: Callable, encoding: str | None = None) -> list[dict]:
+    """
+    Stream source with lxml iterparse and return list of records.
+    Elements are cleared as soon as they are converted, so memory holds only the projected records.
+    encoding overrides the document encoding (for files without BOM / XML declaration).
+    """
+    # Field name -> the one string object used as key in all records
+    wanted = {name: sys.intern(name) for name in fields}
+    tags = [f'{{*}}{name}' for name in records]
+    results = []
+
+    context = etree.iterparse(source, events=('end', ), tag=tags, huge_tree=True,
+                              remove_comments=True, encoding=encoding)
+    for _, el in context:
+        parent = el.getparent()
+        # Item elements also appear inside promotions (PromotionItems/Item) - only take list records
+        if parent is not None and local_name(parent) in records[local_name(el)]:
+            results.append(make_record(el, wanted))
+            # Free parsed element and siblings already handled
+            el.clear(keep_tail=True)
+            while el.getprevious() is not None:
+                del parent[0]
+    del context
+
+    return results
+
+
+def parse_price_items(source: IO[bytes] | str, encoding: str | None = None) -> list[dict]:
+    """ Parse PriceFull / Price file into list of item dicts with typed prices """
+    return iter_records(source, PRICE_RECORDS, PRICE_FIELDS, flat_record, encoding)
+
+
+def parse_promo_items(source: IO[bytes] | str, encoding: str | None = None) -> list[dict]:
+    """ Parse PromoFull / Promo file into list of promotion dicts """
+    return iter_records(source, PROMO_RECORDS, PROMO_FIELDS, nested_record, encoding)
+
+
+class MISSING:
+    """ Column value of a field the record does not have (a class - keeps its identity through pickling) """
+
+
+def to_columns(records: list[dict]) -> dict[str, list]:
+    """
+    Records → columns (field -> list of values, MISSING where the record has no such field).
+    Much smaller to pickle between processes than a list of dicts - each field name is sent once.
+    """
+    fields = dict.fromkeys(name for record in records for name in record)
+    return {name: [record.get(name, MISSING) for record in records] for name in fields}
+
+
+def from_columns(columns: dict[str, list]) -> list[dict]:
+    """ Columns → records, the reverse of to_columns - the same fields as the parsed records, None values kept """
+    fields = list(columns)
+    return [{name: value for name, value in zip(fields, values) if value is not MISSING}
+            for values in zip(*columns.values())]
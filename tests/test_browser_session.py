@@ -0,0 +1,149 @@
+""" Browser sessions of PublishedPrices chains - one login per credential until it expires """
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('playwright')
+
+from backend.utilities import browser_session
+from backend.utilities.backend_loop import in_backend_loop, run_on_backend_loop
+from backend.utilities.browser_session import BrowserManager, get_browser_manager
+
+
+class FakePage:
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, cookies: list[dict]):
+        self._cookies = cookies
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage()
+
+    async def cookies(self):
+        return self._cookies
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    """ Browser whose contexts carry the given cookies """
+    def __init__(self, cookies: list[dict] = ()):
+        self.cookies = list(cookies)
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self):
+        self.contexts.append(FakeContext(self.cookies))
+        return self.contexts[-1]
+
+
+def manager(browser: FakeBrowser) -> BrowserManager:
+    """ Manager using the fake browser - must be created in the running loop """
+    result = BrowserManager()
+
+    async def get_browser():
+        result.browser = browser
+        return browser
+
+    result.get_browser = get_browser
+    return result
+
+
+def counting_login():
+    logins = []
+
+    async def login(page):
+        logins.append(page)
+        await asyncio.sleep(0.01)
+
+    return login, logins
+
+
+def test_concurrent_callers_log_in_once():
+    browser = FakeBrowser([{'name': 'cftpSID', 'value': 'abc', 'expires': -1}])
+    login, logins = counting_login()
+
+    async def run():
+        browsers = manager(browser)
+        return await asyncio.gather(*(browsers.session('https://url.test/login', 'user', login) for _ in range(3)))
+
+    sessions = asyncio.run(run())
+    assert len(logins) == 1
+    assert all(session is sessions[0] for session in sessions)
+    assert sessions[0].cookies == {'cftpSID': 'abc'}
+
+
+def test_expired_session_logs_in_again():
+    """ The earliest cookie expiry ends the session before the TTL - the old context is closed """
+    browser = FakeBrowser([{'name': 'cftpSID', 'value': 'abc', 'expires': time.time() + 0.05}])
+    login, logins = counting_login()
+
+    async def run():
+        browsers = manager(browser)
+        first = await browsers.session('https://url.test/login', 'user', login)
+        assert first.fresh
+        assert await browsers.session('https://url.test/login', 'user', login) is first
+        await asyncio.sleep(0.1)
+        second = await browsers.session('https://url.test/login', 'user', login)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(logins) == 2
+    assert second is not first
+    assert browser.contexts[0].closed
+
+
+def test_failed_login_is_not_kept():
+    browser = FakeBrowser()
+
+    async def login(page):
+        raise TimeoutError('login form not found')
+
+    async def run():
+        browsers = manager(browser)
+        with pytest.raises(TimeoutError):
+            await browsers.session('https://url.test/login', 'user', login)
+        return browsers
+
+    assert asyncio.run(run()).sessions == {}
+    assert browser.contexts[0].closed
+
+
+def test_invalidate_closes_the_session():
+    browser = FakeBrowser()
+    login, logins = counting_login()
+
+    async def run():
+        browsers = manager(browser)
+        await browsers.session('https://url.test/login', 'user', login)
+        await browsers.invalidate('https://url.test/login', 'user')
+        await browsers.session('https://url.test/login', 'user', login)
+
+    asyncio.run(run())
+    assert len(logins) == 2
+    assert browser.contexts[0].closed
+
+
+def test_one_manager_on_the_backend_loop(monkeypatch):
+    """ Playwright objects are bound to their loop - the manager is used on the backend loop only """
+    monkeypatch.setattr(browser_session, '_manager', None)
+
+    async def off_loop():
+        get_browser_manager()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(off_loop())
+
+    async def on_loop():
+        return get_browser_manager()
+
+    first = run_on_backend_loop(on_loop())
+    assert asyncio.run(in_backend_loop(on_loop())) is first
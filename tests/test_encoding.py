@@ -0,0 +1,62 @@
+""" Encoding resolution - BOM, XML declaration, UTF-8 sample, chardet fallback """
+import codecs
+import io
+
+import pytest
+
+from backend.utilities import encoding
+from backend.utilities.encoding import declared_encoding, detect_encoding
+from backend.utilities.url_to_dict import parse_source
+
+
+HEBREW = 'חלב תנובה 3% בקרטון' * 20
+
+
+@pytest.mark.parametrize('data, expected', [
+    (codecs.BOM_UTF8 + b'<Root/>', 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE + '<Root/>'.encode('utf-16-le'), 'utf-16'),
+    (codecs.BOM_UTF32_LE + '<Root/>'.encode('utf-32-le'), 'utf-32'),
+    (b'<?xml version="1.0" encoding="windows-1255"?><Root/>', 'cp1255'),
+    (b"  <?xml version='1.0' encoding='UTF-8'?><Root/>", 'utf-8'),
+    (b'<?xml version="1.0" encoding="no-such-codec"?><Root/>', None),
+    (b'<Root/>', None),
+])
+def test_declared_encoding(data, expected):
+    """ BOM first (UTF-32 before UTF-16), then the declaration - unknown codecs are ignored """
+    assert declared_encoding(data) == expected
+
+
+def test_detect_undeclared_utf8_without_chardet(monkeypatch):
+    """ Valid UTF-8 is recognized from the sample - chardet is not called, a character cut at the end is fine """
+    monkeypatch.setattr(encoding.chardet, 'detect', lambda data: pytest.fail('chardet called'))
+    data = f'<Root>{HEBREW}</Root>'.encode()
+    assert detect_encoding(data) == 'utf-8'
+    assert detect_encoding(data[:-(len('</Root>') + 1)]) == 'utf-8'
+
+
+def test_detect_falls_back_to_chardet_on_small_sample(monkeypatch):
+    """ Non UTF-8 without declaration → chardet on CHARDET_SAMPLE_SIZE bytes only """
+    seen = []
+
+    def fake_detect(data):
+        seen.append(len(data))
+        return {'encoding': 'windows-1255'}
+
+    monkeypatch.setattr(encoding.chardet, 'detect', fake_detect)
+    data = f'<Root>{HEBREW * 100}</Root>'.encode('cp1255')
+    assert detect_encoding(data) == 'cp1255'
+    assert seen == [encoding.CHARDET_SAMPLE_SIZE]
+
+
+def test_detect_unknown_falls_back_to_utf8(monkeypatch):
+    """ chardet without an answer → utf-8 """
+    monkeypatch.setattr(encoding.chardet, 'detect', lambda data: {'encoding': None})
+    assert detect_encoding('<Root>é</Root>'.encode('latin-1')) == 'utf-8'
+
+
+def test_parse_undeclared_windows_1255_file(monkeypatch):
+    """ A price file without BOM / declaration in windows-1255 parses to the right text """
+    monkeypatch.setattr(encoding.chardet, 'detect', lambda data: {'encoding': 'windows-1255'})
+    xml = '<Root><Items><Item><ItemCode>1</ItemCode><ItemName>חלב</ItemName></Item></Items></Root>'
+    assert parse_source(io.BytesIO(xml.encode('cp1255')), 'prices') == [{'ItemCode': '1', 'ItemName': 'חלב'}]
+    assert parse_source(io.BytesIO(xml.encode('cp1255')), 'dict')['Root']['Items']['Item']['ItemName'] == 'חלב'
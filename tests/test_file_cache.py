@@ -0,0 +1,201 @@
+""" On-disk cache of chain files - URL keys, private directory, snapshots, lineage and eviction """
+import asyncio
+import gzip
+import io
+import os
+import stat
+import time
+
+import pytest
+
+from backend.utilities import file_cache, url_to_dict
+
+
+URL = 'https://prices.test/PriceFull7290027600007-001-202511080300.gz'
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """ Empty cache in a temp directory """
+    monkeypatch.setattr(file_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    file_cache.clear()
+    yield file_cache
+    file_cache.clear()
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://Prices.Test:443/a/File-20251108.gz', 'https://prices.test/a/File-20251108.gz'),
+    ('http://prices.test:80/a/File-20251108.gz', 'http://prices.test/a/File-20251108.gz'),
+    ('http://prices.test:8080/a/File-20251108.gz', 'http://prices.test:8080/a/File-20251108.gz'),
+    ('https://prices.test/a/File-20251108.gz?b=2&a=1#top', 'https://prices.test/a/File-20251108.gz?a=1&b=2'),
+    ('https://x.blob.core.windows.net/price/File-20251108.gz?sv=1&sig=abc',
+     'https://x.blob.core.windows.net/price/File-20251108.gz'),
+    (' https://prices.test\\a\\File-20251108.gz ', 'https://prices.test/a/File-20251108.gz'),
+])
+def test_normalize_url(url, expected):
+    """ Spellings of the same file get the same key - signed blob urls without their signature """
+    assert file_cache.normalize_url(url) == expected
+    assert file_cache.cache_key(url) == file_cache.cache_key(expected)
+
+
+@pytest.mark.parametrize('url, cacheable', [
+    (URL, True),
+    ('https://prices.test/PromoFull7290700100008-000-002-20251101-100000.gz', True),
+    ('https://prices.test/Stores7290055700007-000-20251101-050000.xml', True),
+    ('https://prices.test/20251101/latest.gz', False),
+    ('https://prices.test/FileObject/UpdateCategory?catID=2&date=202511080300', False),
+])
+def test_is_cacheable(url, cacheable):
+    """ Only timestamped file names are immutable """
+    assert file_cache.is_cacheable(url) is cacheable
+
+
+def test_raw_round_trip(cache):
+    """ A downloaded file is read back from the cache, rewound """
+    download = io.BytesIO(b'gzip bytes')
+    path = cache.put_raw(URL, download)
+    assert download.tell() == 0
+    assert path == cache.raw_path(URL)
+    with cache.open_raw(URL.replace('https://prices.test', 'https://PRICES.test:443')) as cached:
+        assert cached.read() == b'gzip bytes'
+    assert not [name for name in os.listdir(cache.CACHE_DIR) if name.endswith('.tmp')]
+
+
+def test_not_cacheable_url_is_not_stored(cache):
+    """ Files without timestamp may change behind their url """
+    url = 'https://prices.test/latest.gz'
+    assert cache.put_raw(url, io.BytesIO(b'data')) is None
+    assert cache.open_raw(url) is None
+
+
+def test_parsed_round_trip(cache):
+    """ url → content hash → parsed snapshot """
+    cache.put_snapshot('abc', [{'ItemCode': '1'}], 'prices')
+    cache.put_parsed(URL, 'abc', 'prices')
+    assert cache.get_parsed(URL, 'prices') == [{'ItemCode': '1'}]
+    assert cache.get_parsed(URL, 'promos') is None
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX permissions')
+def test_cache_dir_is_private(cache):
+    """ Created with mode 0700 - a directory others can write to is made private """
+    assert cache.cache_dir_ready()
+    assert stat.S_IMODE(os.stat(cache.CACHE_DIR).st_mode) == 0o700
+
+    os.chmod(cache.CACHE_DIR, 0o777)
+    cache._cache_dir_ready = False
+    assert cache.cache_dir_ready()
+    assert stat.S_IMODE(os.stat(cache.CACHE_DIR).st_mode) == 0o700
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX ownership')
+def test_cache_dir_of_another_user_is_not_used(cache, monkeypatch):
+    """ Pickles in a directory another user controls are never read or written """
+    cache.put_snapshot('abc', [{'ItemCode': '1'}])
+    cache._cache_dir_ready = False
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(cache.CACHE_DIR).st_uid + 1)
+
+    assert not cache.cache_dir_ready()
+    assert cache.get_snapshot('abc') is None
+    assert cache.put_raw(URL, io.BytesIO(b'data')) is None
+    assert not os.path.exists(cache.raw_path(URL))
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX symlinks')
+def test_cache_dir_symlink_is_not_used(cache, tmp_path):
+    """ A symlink planted at the cache path is not followed """
+    os.makedirs(tmp_path / 'elsewhere')
+    os.symlink(tmp_path / 'elsewhere', cache.CACHE_DIR)
+    assert not cache.cache_dir_ready()
+
+
+def test_republished_content_shares_one_snapshot(cache, monkeypatch):
+    """ The same content under a new file name is hashed, not parsed again - the lineage shows it unchanged """
+    xml = b'<Root><Items><Item><ItemCode>1</ItemCode><ItemPrice>5.90</ItemPrice></Item></Items></Root>'
+    # Same content, different gzip header (file name / mtime) as when a chain republishes a file
+    files = {URL: gzip.compress(xml, mtime=1), URL.replace('0300', '0400'): gzip.compress(xml, mtime=2)}
+    parsed = []
+
+    async def fake_open_url_file(url, cookies=None, client=None):
+        return io.BytesIO(files[url])
+
+    parse_source = url_to_dict.parse_source
+
+    def counting_parse_source(*args, **kwargs):
+        parsed.append(args[1])
+        return parse_source(*args, **kwargs)
+
+    monkeypatch.setattr(url_to_dict, 'open_url_file', fake_open_url_file)
+    monkeypatch.setattr(url_to_dict, 'parse_source', counting_parse_source)
+
+    async def parse_all():
+        return [await url_to_dict.data_items(url, 'prices', lineage='1_2') for url in files]
+
+    first, second = asyncio.run(parse_all())
+    assert first == second == [{'ItemCode': '1', 'ItemPrice': 5.9}]
+    assert parsed == ['prices']
+    assert len([name for name in os.listdir(cache.CACHE_DIR) if name.startswith('snap-')]) == 1
+    lineage = cache.get_lineage('1_2')
+    assert [entry['url'] for entry in lineage] == list(files)
+    assert lineage[0]['hash'] == lineage[1]['hash']
+    # Parsed result of each url is now cached
+    assert asyncio.run(url_to_dict.data_items(URL, 'prices')) == first
+    assert parsed == ['prices']
+
+
+def test_lineage(cache, monkeypatch):
+    """ add_lineage tells whether the content changed since the previous file of the same kind """
+    monkeypatch.setattr(cache, 'LINEAGE_LENGTH', 3)
+    assert cache.add_lineage('store', 'u1', 'h1') is False
+    assert cache.add_lineage('store', 'u1', 'h1') is True  # Same file again
+    assert cache.add_lineage('store', 'p1', 'h1', kind='promos') is False  # Other kind has its own history
+    assert cache.add_lineage('store', 'u2', 'h1') is True
+    assert cache.add_lineage('store', 'u3', 'h2') is False
+    assert [entry['url'] for entry in cache.get_lineage('store')] == ['p1', 'u2', 'u3']
+
+
+def age(path: str, seconds: float):
+    """ Make the cache entry look last used seconds ago """
+    when = time.time() - seconds
+    os.utime(path, (when, when))
+
+
+def test_evict_keeps_pinned_and_recent_entries(cache):
+    """ Least recently used first - entries in use (pinned) or used within EVICT_GRACE are kept """
+    urls = [URL.replace('0300', f'03{n:02d}') for n in range(4)]
+    paths = [cache.put_raw(url, io.BytesIO(b'x' * 100)) for url in urls]
+    for n, path in enumerate(paths[:3]):
+        age(path, cache.EVICT_GRACE * (4 - n))
+
+    with cache.pinned(paths[0]):
+        cache.evict(max_bytes=0)
+        assert [os.path.exists(path) for path in paths] == [True, False, False, True]
+    cache.evict(max_bytes=0)
+    assert [os.path.exists(path) for path in paths] == [False, False, False, True]
+
+
+def test_evict_stops_under_the_limit(cache):
+    """ Only as many old entries as needed are deleted, oldest first """
+    paths = [cache.put_raw(URL.replace('0300', f'03{n:02d}'), io.BytesIO(b'x' * 100)) for n in range(3)]
+    for n, path in enumerate(paths):
+        age(path, cache.EVICT_GRACE * (4 - n))
+    cache.evict(max_bytes=250)
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+
+
+def test_writes_over_the_limit_scan_at_most_once_per_retry(cache, monkeypatch):
+    """ Recent entries cannot be evicted - writes do not scan the directory again until EVICT_RETRY passed """
+    monkeypatch.setattr(cache, 'MAX_CACHE_BYTES', 150)
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or scandir(path))
+
+    for n in range(5):
+        cache.put_raw(URL.replace('0300', f'03{n:02d}'), io.BytesIO(b'x' * 100))
+    # First write counts the cache, the second goes over the limit and cannot evict anything
+    assert len(scans) == 2
+    assert len(os.listdir(cache.CACHE_DIR)) == 5
+
+    cache._next_scan -= cache.EVICT_RETRY
+    cache.put_raw(URL.replace('0300', '0310'), io.BytesIO(b'x' * 100))
+    assert len(scans) == 3
@@ -0,0 +1,103 @@
+""" File catalog of a chain - file name parsing and latest / as of lookups """
+import re
+from datetime import datetime
+
+import pytest
+
+from backend.utilities.file_catalog import FileCatalog, FileRecord, parse_file_url
+
+
+BASE = 'https://prices.test/'
+
+
+def record(name: str) -> FileRecord:
+    return parse_file_url(BASE + name, chain='7290027600007')
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('PriceFull7290027600007-001-202511080300.gz', (datetime(2025, 11, 8, 3), 1, 'pricefull')),
+    ('Price7290027600007-001-202511080300.gz', (datetime(2025, 11, 8, 3), 1, 'price')),
+    ('PromoFull7290700100008-000-002-20251101-100000.gz', (datetime(2025, 11, 1, 10), 2, 'promofull')),
+    ('promo7290700100008-000-002-20251101-1000.xml', (datetime(2025, 11, 1, 10), 2, 'promo')),
+    ('Stores7290055700007-000-20251101-050000.xml', (datetime(2025, 11, 1, 5), 0, 'stores')),
+    ('Store7290055700007-000-20251101.xml', (datetime(2025, 11, 1), 0, 'stores')),
+])
+def test_parse_file_url(name, expected):
+    """ Type, store and timestamp of the file names of the chains """
+    parsed = record(name)
+    assert (parsed.timestamp, parsed.store, parsed.file_type) == expected
+    assert parsed.url == BASE + name
+    assert parsed.chain == '7290027600007'
+
+
+@pytest.mark.parametrize('url', [
+    BASE + 'latest.gz',
+    BASE + 'PriceFull7290027600007-001-20251399-0300.gz',  # No such date
+])
+def test_parse_file_url_without_timestamp(url):
+    assert parse_file_url(url) is None
+
+
+def test_parse_file_url_with_chain_pattern():
+    """ Chains with their own file names pass a pattern with type, store, date and time groups """
+    pattern = re.compile(r'(price|promo)_s(\d+)_(\d{8})_(\d{4})', re.IGNORECASE)
+    parsed = parse_file_url(BASE + 'files/Price_s12_20251108_0300.gz', pattern=pattern)
+    assert (parsed.timestamp, parsed.store, parsed.file_type) == (datetime(2025, 11, 8, 3), 12, 'price')
+
+
+def catalog() -> FileCatalog:
+    """ Two stores, listed out of time order, with an unparsable file """
+    return FileCatalog(record(name) for name in [
+        'PriceFull7290027600007-001-202511080300.gz',
+        'PriceFull7290027600007-001-202511060300.gz',
+        'PriceFull7290027600007-001-202511070300.gz',
+        'Price7290027600007-001-202511080400.gz',
+        'PriceFull7290027600007-002-202511050300.gz',
+        'latest.gz',
+    ])
+
+
+def test_latest_urls():
+    """ Latest url per result key - None for types without files """
+    names = {'price': 'price', 'pricefull': 'pricefull', 'promo': 'promo'}
+    assert catalog().latest_urls('001', names) == {
+        'price': BASE + 'Price7290027600007-001-202511080400.gz',
+        'pricefull': BASE + 'PriceFull7290027600007-001-202511080300.gz',
+        'promo': None,
+    }
+    assert catalog().latest_urls(2, {'PriceFull': 'pricefull'}) == {
+        'PriceFull': BASE + 'PriceFull7290027600007-002-202511050300.gz'}
+
+
+def test_records_sorted_when_listed_out_of_order():
+    files = catalog()
+    assert len(files) == 5
+    assert [r.timestamp.day for r in files.records(1, 'pricefull')] == [6, 7, 8]
+    assert files.stores() == {1, 2}
+    assert files.latest(3, 'pricefull') is None
+
+
+def test_as_of():
+    """ File published at or before the given time """
+    files = catalog()
+    assert files.as_of(1, 'pricefull', datetime(2025, 11, 7, 12)).timestamp == datetime(2025, 11, 7, 3)
+    assert files.as_of(1, 'pricefull', datetime(2025, 11, 7, 3)).timestamp == datetime(2025, 11, 7, 3)
+    assert files.as_of(1, 'pricefull', datetime(2025, 11, 1)) is None
+
+
+def test_same_url_added_once():
+    files = catalog()
+    files.add(record('PriceFull7290027600007-001-202511080300.gz'))
+    assert len(files) == 5
+    assert len(files.records(1, 'pricefull')) == 3
+
+
+def test_prune():
+    """ Old records are dropped - their urls can be added again """
+    files = catalog()
+    files.prune(datetime(2025, 11, 7))
+    assert [r.timestamp.day for r in files.records(1, 'pricefull')] == [7, 8]
+    assert files.stores() == {1}
+    assert BASE + 'PriceFull7290027600007-002-202511050300.gz' not in files
+    files.add(record('PriceFull7290027600007-002-202511050300.gz'))
+    assert files.stores() == {1, 2}
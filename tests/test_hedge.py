@@ -0,0 +1,105 @@
+""" Hedged listing requests - duplicate after the host budget, censored latency samples """
+import asyncio
+
+import httpx
+import pytest
+
+from backend.utilities import url_request
+from backend.utilities.http_client import host_key
+from backend.utilities.url_request import hedge_budget, hedged
+
+
+@pytest.fixture(autouse=True)
+def short_budget(monkeypatch):
+    """ Default budget short enough for tests - latency samples start empty """
+    monkeypatch.setattr(url_request, 'HEDGE_DEFAULT_BUDGET', 0.1)
+    monkeypatch.setattr(url_request, 'HEDGE_MIN_BUDGET', 0.01)
+    monkeypatch.setattr(url_request, '_hedge_latencies', {})
+
+
+def attempts(*delays_and_results):
+    """ make_request whose n-th call waits delay and returns result - and the list of started calls """
+    started = []
+
+    async def make_request():
+        delay, result = delays_and_results[len(started)]
+        started.append(delay)
+        await asyncio.sleep(delay)
+        return result
+
+    return make_request, started
+
+
+def samples(url: str) -> list[float]:
+    return sorted(url_request._hedge_latencies.get(host_key(url), ()))
+
+
+def test_fast_answer_is_not_hedged():
+    """ An answer within the budget - no duplicate, one latency sample """
+    make_request, started = attempts((0.0, {'response': b'ok'}))
+    assert asyncio.run(hedged(make_request, 'https://fast.test/')) == {'response': b'ok'}
+    assert len(started) == 1
+    assert len(samples('https://fast.test/')) == 1
+
+
+def test_slow_answer_is_hedged_and_the_loser_recorded_as_censored():
+    """ The duplicate wins - the cancelled attempt is a sample of at least the budget """
+    make_request, started = attempts((1.0, {'response': b'slow'}), (0.0, {'response': b'fast'}))
+    assert asyncio.run(hedged(make_request, 'https://slow.test/')) == {'response': b'fast'}
+    assert len(started) == 2
+    fast, censored = samples('https://slow.test/')
+    assert fast < 0.1
+    assert 0.1 <= censored < 1.0
+
+
+def test_first_attempt_may_still_win():
+    """ The original request answering after the budget but before the duplicate wins """
+    make_request, started = attempts((0.15, {'response': b'first'}), (1.0, {'response': b'second'}))
+    assert asyncio.run(hedged(make_request, 'https://late.test/')) == {'response': b'first'}
+    assert len(started) == 2
+    assert len(samples('https://late.test/')) == 2
+
+
+def test_error_waits_for_the_other_attempt():
+    """ An error of one attempt does not end the request while the other may succeed """
+    make_request, started = attempts((0.15, {'Error': 'reset'}), (0.1, {'response': b'ok'}))
+    assert asyncio.run(hedged(make_request, 'https://flaky.test/')) == {'response': b'ok'}
+
+
+def test_both_failing_return_the_last_error():
+    """ The error of the attempt that finished last is returned """
+    make_request, started = attempts((0.12, {'Error': 'first'}), (0.06, {'Error': 'second'}))
+    assert asyncio.run(hedged(make_request, 'https://down.test/')) == {'Error': 'second'}
+    assert len(started) == 2
+    # Failed attempts are no latency samples
+    assert samples('https://down.test/') == []
+
+
+def test_budget_is_p95_of_recent_samples():
+    """ Default budget until HEDGE_MIN_SAMPLES, then the p95 latency of the host, not below the minimum """
+    url = 'https://budget.test/'
+    latencies = url_request._hedge_latencies.setdefault(host_key(url), [])
+    latencies.extend([0.2] * (url_request.HEDGE_MIN_SAMPLES - 1))
+    assert hedge_budget(url) == 0.1
+    latencies[:] = [0.2] * 18 + [3.0, 4.0]
+    assert hedge_budget(url) == 3.0
+    latencies[:] = [0.001] * 40
+    assert hedge_budget(url) == 0.01
+
+
+def test_url_request_hedge_over_transport():
+    """ url_request(hedge=True) sends the duplicate through the same client """
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+        return httpx.Response(200, content=b'listing')
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await url_request.url_request('https://listing.test/files', client=client, hedge=True)
+
+    assert asyncio.run(run()) == {'response': b'listing'}
+    assert len(calls) == 2
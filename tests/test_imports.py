@@ -0,0 +1,37 @@
+""" Smoke tests - chain adapter modules import and register their chains """
+import importlib
+import importlib.util
+
+import pytest
+
+from backend.core.registry import CHAINS, load_chain
+
+
+@pytest.mark.parametrize('module', sorted({info.module for info in CHAINS}))
+def test_chain_module_imports(module):
+    """ Each adapter module imports (modules needing the browser stack are skipped without it) """
+    if module == 'backend.core.publishedprices':
+        pytest.importorskip('playwright')
+    importlib.import_module(module)
+
+
+@pytest.mark.parametrize('info', CHAINS, ids=lambda info: info.alias)
+def test_chain_loads(info):
+    """ Each registered chain resolves to its adapter class, with the same metadata as the class """
+    if info.link_type == 'publishedprices':
+        pytest.importorskip('playwright')
+    chain = load_chain(info)
+    assert (chain.chain_code, chain.alias, chain.name, chain.link_type) == info[:4]
+
+
+def test_registry_lists_all_chains_of_its_modules():
+    """ Every chain class of a registered adapter module has a registry entry """
+    from backend.core.super_class import SupermarketChain
+    modules = {info.module for info in CHAINS}
+    if 'backend.core.publishedprices' in modules and importlib.util.find_spec('playwright') is None:
+        modules.discard('backend.core.publishedprices')
+    for module in modules:
+        importlib.import_module(module)
+    registered = {(info.module, info.class_name) for info in CHAINS}
+    classes = {(c.__module__, c.__name__) for c in SupermarketChain.registry if c.__module__ in modules}
+    assert classes <= registered
@@ -0,0 +1,159 @@
+""" Per-host limiter - token bucket and AIMD concurrency """
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend.utilities.rate_limit import HostLimiter, Outcome, configure_host, limiter_for
+
+
+def outcome(status: int | None = 200, error: Exception | None = None, retry_after: str | None = None) -> Outcome:
+    """ Outcome of a finished request """
+    result = Outcome()
+    if status is not None:
+        headers = {'Retry-After': retry_after} if retry_after else {}
+        result.record_response(httpx.Response(status, headers=headers))
+    if error is not None:
+        result.record_error(error)
+    return result
+
+
+def test_healthy_responses_grow_concurrency_additively():
+    """ About one more slot per window of healthy responses, up to max_concurrency """
+    limiter = HostLimiter(initial_concurrency=4, max_concurrency=5)
+    for _ in range(4):
+        limiter.active += 1
+        limiter.release(0.1, outcome())
+    assert limiter.limit == pytest.approx(4.9, abs=0.05)
+    for _ in range(20):
+        limiter.active += 1
+        limiter.release(0.1, outcome())
+    assert limiter.limit == 5
+
+
+@pytest.mark.parametrize('result', [
+    outcome(429),
+    outcome(503),
+    outcome(None, httpx.ReadTimeout('timeout')),
+    outcome(None, httpx.ConnectError('refused')),
+])
+def test_congestion_halves_concurrency(result):
+    """ 429 / 5xx / transport errors halve the limit, not below min_concurrency """
+    limiter = HostLimiter(initial_concurrency=8, min_concurrency=3)
+    limiter.active = 2
+    limiter.release(0.1, result)
+    assert limiter.limit == 4
+    limiter.release(0.1, result)
+    assert limiter.limit == 3
+    assert limiter.active == 0
+
+
+def test_other_errors_keep_concurrency():
+    """ 404 is not congestion, an error that is not a transport error neither grows nor shrinks the limit """
+    limiter = HostLimiter(initial_concurrency=4)
+    limiter.active = 2
+    limiter.release(0.1, outcome(404))
+    assert limiter.limit == 4.25
+    limiter.release(0.1, outcome(None, ValueError('bad json')))
+    assert limiter.limit == 4.25
+
+
+def test_slow_headers_halve_concurrency():
+    """ Time to headers over latency_target counts as congestion """
+    limiter = HostLimiter(initial_concurrency=4, latency_target=1.0)
+    limiter.active = 1
+    limiter.release(2.0, outcome())
+    assert limiter.limit == 2
+
+
+def test_retry_after_pauses_the_host():
+    """ Retry-After of a 429 stops handing out tokens for that long """
+    limiter = HostLimiter()
+    limiter.active = 1
+    limiter.release(0.1, outcome(429, retry_after='30'))
+    assert 29 < limiter._take_token() <= 30
+
+
+def test_token_bucket_burst_then_rate():
+    """ burst requests at once, then one per 1 / rate seconds """
+    limiter = HostLimiter(rate=10.0, burst=3)
+    assert [limiter._take_token() for _ in range(3)] == [0, 0, 0]
+    assert limiter._take_token() == pytest.approx(0.1, abs=0.01)
+
+
+def test_slot_measures_time_to_headers():
+    """ A long body download after the headers does not count as latency """
+    async def run():
+        limiter = HostLimiter(initial_concurrency=4, latency_target=0.05)
+        async with limiter.slot() as result:
+            result.record_response(httpx.Response(200))
+            await asyncio.sleep(0.1)  # Streaming the body
+        return limiter, result
+
+    limiter, result = asyncio.run(run())
+    assert result.latency < 0.05
+    assert limiter.limit == 4.25
+    assert limiter.latencies[-1] == result.latency
+
+
+def test_slot_without_response_measures_time_to_failure():
+    """ No response (exception) - the time to the failure is the latency, the error is recorded """
+    async def run():
+        limiter = HostLimiter(initial_concurrency=4)
+        with pytest.raises(httpx.ConnectError):
+            async with limiter.slot():
+                await asyncio.sleep(0.02)
+                raise httpx.ConnectError('refused')
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.latencies[-1] >= 0.02
+    assert limiter.limit == 2
+    assert limiter.active == 0
+
+
+def test_concurrency_limit_queues_requests():
+    """ With one slot the second request starts only when the first released its slot """
+    async def run():
+        limiter = HostLimiter(initial_concurrency=1, max_concurrency=1)
+        events = []
+
+        async def request(name):
+            async with limiter.slot() as result:
+                events.append(f'start {name}')
+                await asyncio.sleep(0.02)
+                result.record_response(httpx.Response(200))
+                events.append(f'end {name}')
+
+        await asyncio.gather(request('a'), request('b'))
+        return events
+
+    assert asyncio.run(run()) == ['start a', 'end a', 'start b', 'end b']
+
+
+def test_cancelled_waiter_passes_the_slot_on():
+    """ A request cancelled while queued does not keep or lose a slot """
+    async def run():
+        limiter = HostLimiter(initial_concurrency=1, max_concurrency=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        limiter.release(0.01, outcome())
+        start = time.monotonic()
+        await asyncio.wait_for(limiter.acquire(), 1)
+        return limiter, time.monotonic() - start
+
+    limiter, waited = asyncio.run(run())
+    assert limiter.active == 1
+    assert waited < 0.5
+
+
+def test_one_limiter_per_host():
+    """ All urls of a host share a limiter - configure_host overrides its settings """
+    assert limiter_for('https://limits.test/a') is limiter_for('HTTPS://LIMITS.test/b?c=1')
+    assert limiter_for('https://limits.test/a') is not limiter_for('https://other.limits.test/a')
+    configure_host('https://limits.test/', rate=1.0, max_concurrency=2)
+    limiter = limiter_for('https://limits.test/a')
+    assert (limiter.rate, limiter.max_concurrency) == (1.0, 2)
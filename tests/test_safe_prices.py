@@ -0,0 +1,79 @@
+""" safe_prices - one prices() call per store for concurrent callers, results reused for RESOLVE_TTL """
+import asyncio
+
+import pytest
+
+from backend.core import super_class
+from backend.core.super_class import SupermarketChain
+
+
+class FakeChain(SupermarketChain):
+    """ Chain whose prices() answers after a short delay - counts the calls per store """
+    abstract = True  # Not in the registry
+    alias = 'Fake'
+    chain_code = '7290000000001'
+    calls = []
+    result = {'price': 'https://prices.test/Price.gz', 'promo': None}
+
+    @classmethod
+    async def prices(cls, store_code):
+        cls.calls.append(str(store_code))
+        await asyncio.sleep(0.05)
+        if isinstance(cls.result, Exception):
+            raise cls.result
+        return dict(cls.result)
+
+
+@pytest.fixture(autouse=True)
+def fake_chain(monkeypatch):
+    """ Nothing resolved yet - no calls """
+    monkeypatch.setattr(super_class, '_resolved', {})
+    monkeypatch.setattr(FakeChain, 'calls', [])
+
+
+def test_concurrent_calls_share_one_prices_call():
+    async def run():
+        return await asyncio.gather(*(FakeChain.safe_prices(store) for store in ['1', 1, '1', '2']))
+
+    results = asyncio.run(run())
+    assert sorted(FakeChain.calls) == ['1', '2']
+    assert all(result == FakeChain.result for result in results)
+    # Every caller gets its own copy
+    assert results[0] is not results[1]
+
+
+def test_result_reused_within_ttl(monkeypatch):
+    first = asyncio.run(FakeChain.safe_prices(1))
+    first['price'] = 'changed by the caller'
+    assert asyncio.run(FakeChain.safe_prices(1)) == FakeChain.result
+    assert FakeChain.calls == ['1']
+
+    monkeypatch.setattr(super_class, 'RESOLVE_TTL', 0)
+    asyncio.run(FakeChain.safe_prices(1))
+    assert FakeChain.calls == ['1', '1']
+
+
+@pytest.mark.parametrize('result, expected', [
+    (RuntimeError('login failed'), None),
+    ({'Error': 'HTTP error: 503'}, {'Error': 'HTTP error: 503'}),
+    ({}, {}),
+])
+def test_failures_are_not_cached(monkeypatch, result, expected):
+    """ Exceptions give None, Error dicts and empty results are returned - none of them is reused """
+    monkeypatch.setattr(FakeChain, 'result', result)
+    assert asyncio.run(FakeChain.safe_prices(1)) == expected
+    assert asyncio.run(FakeChain.safe_prices(1)) == expected
+    assert FakeChain.calls == ['1', '1']
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    """ The shared prices() call runs on for the callers still waiting """
+    async def run():
+        first = asyncio.ensure_future(FakeChain.safe_prices(1))
+        second = asyncio.ensure_future(FakeChain.safe_prices(1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == FakeChain.result
+    assert FakeChain.calls == ['1']
@@ -0,0 +1,56 @@
+""" Shufersal listing pages - file links and pager """
+import asyncio
+
+from backend.core.shufersal import Shufersal
+
+
+BLOB = 'https://pricesprodpublic.blob.core.windows.net'
+
+
+def listing_page(category: int, page: int, last_page: int) -> bytes:
+    """ UpdateCategory listing page as rendered by the WebGrid - pager hrefs are HTML escaped """
+    pager = ' '.join(
+        f'<a data-swhglnk="true" href="/FileObject/UpdateCategory?catID={category}&amp;storeId=0&amp;page={n}">{n}</a>'
+        for n in range(1, min(last_page, 5) + 1) if n != page)
+    pager += (f' <a data-swhglnk="true" href="/FileObject/UpdateCategory?catID={category}&amp;storeId=0&amp;'
+              f'page={last_page}">&gt;&gt;</a>')
+    return f'''<!DOCTYPE html>
+<html><body>
+<table class="webgrid">
+<thead><tr class="webgrid-header"><th scope="col">
+<a data-swhglnk="true" href="/FileObject/UpdateCategory?catID={category}&amp;storeId=0&amp;sort=Time&amp;sortdir=ASC">Time</a>
+</th><th scope="col">Name</th></tr></thead>
+<tfoot><tr class="webgrid-footer"><td colspan="6">{pager}</td></tr></tfoot>
+<tbody>
+<tr class="webgrid-row-style"><td><a href="{BLOB}/pricefull/PriceFull7290027600007-{page:03d}-202511080300.gz?sv=2014-02-14&amp;sr=b&amp;sig=abc%3D&amp;se=2025-11-08T03%3A30%3A00Z&amp;sp=r" target="_blank">לחץ להורדה</a></td>
+<td>11/8/2025 3:00:00 AM</td><td>PriceFull7290027600007-{page:03d}-202511080300</td></tr>
+</tbody>
+</table>
+</body></html>'''.encode()
+
+
+def test_parse_listing_reads_escaped_pager():
+    """ Page count comes from the (HTML escaped) pager hrefs, file links from the grid body only """
+    links, last_page = Shufersal.parse_listing(listing_page(2, 1, 27))
+    assert last_page == 27
+    assert len(links) == 1
+    assert links[0].startswith(f'{BLOB}/pricefull/PriceFull7290027600007-001-202511080300.gz?sv=2014-02-14&sr=b')
+
+
+def test_parse_listing_without_pager():
+    """ A listing without pager is one page """
+    assert Shufersal.parse_listing(b'<table class="webgrid"><tbody></tbody></table>') == ([], 1)
+
+
+def test_list_category_fetches_all_pages(monkeypatch):
+    """ The first page's pager drives the fetch of all other pages """
+    fetched = []
+
+    async def fake_fetch(store_code, file_type, page=None):
+        fetched.append(page)
+        return {'response': listing_page(file_type, page or 1, 3)}
+
+    monkeypatch.setattr(Shufersal, '_fetch', fake_fetch)
+    links = asyncio.run(Shufersal.list_category(2))
+    assert sorted(fetched, key=lambda page: page or 1) == [None, 2, 3]
+    assert [link.split('-')[1] for link in links] == ['001', '002', '003']
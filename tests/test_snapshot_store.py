@@ -0,0 +1,77 @@
+""" Shared snapshots - reference counts and LRU eviction """
+import gc
+from datetime import datetime
+
+from backend.services.snapshot_store import SnapshotStore, snapshot_key
+
+
+def test_snapshot_key():
+    """ Timestamp of the file, so spellings of the url share a key - the url if it has none """
+    url = 'https://prices.test/PriceFull7290027600007-001-202511080300.gz'
+    assert snapshot_key('prices', 7290027600007, 1, url) == \
+        ('prices', '7290027600007', '1', datetime(2025, 11, 8, 3))
+    assert snapshot_key('prices', 7290027600007, 1, url + '?sig=abc') == snapshot_key('prices', '7290027600007', '1', url)
+    assert snapshot_key('promos', 1, 2, 'https://prices.test/latest.gz')[-1] == 'https://prices.test/latest.gz'
+
+
+def test_handle_is_a_read_only_sequence():
+    store = SnapshotStore()
+    handle = store.put(('a',), [{'ItemCode': '1'}, {'ItemCode': '2'}])
+    assert len(handle) == 2
+    assert handle[1] == {'ItemCode': '2'}
+    assert [item['ItemCode'] for item in handle] == ['1', '2']
+    assert isinstance(handle.data, tuple)
+
+
+def test_concurrent_put_returns_the_stored_copy():
+    """ A second parse of the same file is dropped - both sessions share the first copy """
+    store = SnapshotStore()
+    first = store.put(('a',), [1, 2])
+    second = store.put(('a',), [1, 2])
+    assert second.data is first.data
+    assert store.get(('a',)).data is first.data
+    assert store.get(('b',)) is None
+
+
+def test_referenced_snapshots_are_never_evicted():
+    store = SnapshotStore(capacity=1)
+    handles = [store.put((n,), [n]) for n in range(3)]  # Held - sessions still use them
+    assert store.stats() == {'snapshots': 3, 'referenced': 3, 'items': 3}
+    assert all(store.get((n,)) is not None for n in range(3))
+    del handles
+    gc.collect()
+    assert store.stats() == {'snapshots': 1, 'referenced': 0, 'items': 1}
+
+
+def test_released_snapshots_are_evicted_least_recently_used_first():
+    store = SnapshotStore(capacity=2)
+    for n in range(3):
+        store.put((n,), [n]).release()
+    # Over capacity when the third was put - the oldest unreferenced was dropped
+    assert store.get((0,)) is None
+    store.get((1,)).release()  # 1 is now the most recently used
+    store.put((3,), [3]).release()
+    assert store.get((2,)) is None
+    assert store.get((1,)) is not None
+    assert store.get((3,)) is not None
+
+
+def test_release_is_idempotent():
+    store = SnapshotStore(capacity=0)
+    handle = store.put(('a',), [1])
+    other = store.get(('a',))
+    handle.release()
+    handle.release()
+    assert store.stats()['referenced'] == 1
+    other.release()
+    assert store.stats() == {'snapshots': 0, 'referenced': 0, 'items': 0}
+
+
+def test_garbage_collected_handle_releases_its_snapshot():
+    """ A handle replaced in session_state releases the snapshot without an explicit release() """
+    store = SnapshotStore(capacity=0)
+    handle = store.put(('a',), [1])
+    assert store.stats()['snapshots'] == 1
+    del handle
+    gc.collect()
+    assert store.stats()['snapshots'] == 0
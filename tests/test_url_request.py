@@ -0,0 +1,157 @@
+""" Downloads - HTTP Range resume and integrity checks """
+import asyncio
+import gzip
+import io
+import os
+
+import httpx
+import pytest
+
+from backend.utilities import url_request
+from backend.utilities.url_request import content_range, gzip_complete, stream_to_spool
+
+
+DATA = gzip.compress(os.urandom(50_000))
+URL = 'http://downloads.test/PriceFull7290027600007-001-202511080300.gz'
+
+
+def body(data: bytes):
+    """ Streamed body without Content-Length """
+    async def chunks():
+        yield data
+    return chunks()
+
+
+def broken_body(data: bytes):
+    """ Body that breaks off with a network error after data """
+    async def body():
+        yield data
+        raise httpx.ReadError('connection reset')
+    return body()
+
+
+def serve(handler) -> tuple[httpx.AsyncClient, list[httpx.Request]]:
+    """ Client answering with handler(request, number of request) - and the list of requests it got """
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return handler(request, len(requests))
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(respond)), requests
+
+
+def download(client: httpx.AsyncClient) -> dict:
+    """ stream_to_spool with the client - content read back as bytes """
+    async def run():
+        async with client:
+            result = await stream_to_spool(client, URL)
+        if 'response' in result:
+            with result['response'] as spool:
+                result['response'] = spool.read()
+        return result
+    return asyncio.run(run())
+
+
+def rest_of_file(request: httpx.Request) -> httpx.Response:
+    """ 206 answer to the Range request """
+    start = int(request.headers['Range'].removeprefix('bytes=').rstrip('-'))
+    return httpx.Response(206, content=DATA[start:],
+                          headers={'Content-Range': f'bytes {start}-{len(DATA) - 1}/{len(DATA)}'})
+
+
+def test_broken_download_resumes_with_range():
+    """ Bytes received before the break are kept - the second request asks only for the rest """
+    def handler(request, n):
+        if n == 1:
+            return httpx.Response(200, content=broken_body(DATA[:20_000]),
+                                  headers={'Content-Length': str(len(DATA))})
+        return rest_of_file(request)
+
+    client, requests = serve(handler)
+    assert download(client) == {'response': DATA}
+    assert 'Range' not in requests[0].headers
+    assert requests[1].headers['Range'] == 'bytes=20000-'
+    assert all(request.headers['Accept-Encoding'] == 'identity' for request in requests)
+
+
+def test_range_ignored_starts_over():
+    """ A server that answers the Range request with the whole file replaces what was received """
+    def handler(request, n):
+        if n == 1:
+            return httpx.Response(200, content=broken_body(DATA[:20_000]),
+                                  headers={'Content-Length': str(len(DATA))})
+        return httpx.Response(200, content=DATA)
+
+    client, requests = serve(handler)
+    assert download(client) == {'response': DATA}
+    assert len(requests) == 2
+
+
+def test_truncated_gzip_without_length_is_resumed():
+    """ No Content-Length - the gzip trailer shows the file is incomplete, the rest is requested """
+    def handler(request, n):
+        if n == 1:
+            return httpx.Response(200, content=body(DATA[:30_000]))
+        return rest_of_file(request)
+
+    client, requests = serve(handler)
+    assert download(client) == {'response': DATA}
+    assert requests[1].headers['Range'] == 'bytes=30000-'
+
+
+def test_nothing_left_to_send():
+    """ 416 on the Range request means the earlier attempt already got the whole file """
+    def handler(request, n):
+        if n == 1:
+            return httpx.Response(200, content=broken_body(DATA), headers={'Content-Length': str(len(DATA))})
+        return httpx.Response(416, headers={'Content-Range': f'bytes */{len(DATA)}'})
+
+    client, requests = serve(handler)
+    assert download(client) == {'response': DATA}
+    assert requests[1].headers['Range'] == f'bytes={len(DATA)}-'
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('bytes 100-199/200', (100, 200)),
+    ('bytes 100-199/*', (100, None)),
+    ('bytes */200', (None, 200)),
+    (None, (None, None)),
+])
+def test_content_range(value, expected):
+    """ Content-Range of 206 and 416 answers """
+    assert content_range(value) == expected
+
+
+def test_attempts_are_bounded():
+    """ A file that keeps breaking is given up after DOWNLOAD_ATTEMPTS requests """
+    def handler(request, n):
+        return httpx.Response(200, content=broken_body(b''), headers={'Content-Length': str(len(DATA))})
+
+    client, requests = serve(handler)
+    result = download(client)
+    assert result['Type'] == 'ReadError'
+    assert 'retry' not in result
+    assert len(requests) == url_request.DOWNLOAD_ATTEMPTS
+
+
+def test_client_error_is_not_retried():
+    """ 404 will not get better - one request """
+    client, requests = serve(lambda request, n: httpx.Response(404, text='not found'))
+    assert download(client)['Error'].startswith('HTTP error: 404')
+    assert len(requests) == 1
+
+
+@pytest.mark.parametrize('data, complete', [
+    (DATA, True),
+    (DATA + gzip.compress(b'second member'), True),
+    (DATA[:-4], False),
+    (DATA[:len(DATA) // 2], False),
+    (DATA[:-8] + b'\0' * 8, False),
+])
+def test_gzip_complete(data, complete):
+    """ Complete streams (also of several members) pass, truncated and corrupt trailers do not """
+    file = io.BytesIO(data)
+    file.seek(5)
+    assert gzip_complete(file) is complete
+    assert file.tell() == 0
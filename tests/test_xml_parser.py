@@ -0,0 +1,120 @@
+""" Streaming price / promo parser - schema variants of the chains and the column transfer """
+import gzip
+import io
+import pickle
+
+import pytest
+
+from backend.utilities.url_to_dict import parse_source
+from backend.utilities.xml_parser import parse_price_items, parse_promo_items, to_columns, from_columns
+
+
+ITEMS = '''
+<Items Count="2">
+  <Item>
+    <PriceUpdateDate>2025-11-08 03:00:00</PriceUpdateDate>
+    <ItemCode>7290000000011</ItemCode>
+    <ItemType>1</ItemType>
+    <{name}>חלב 3%</{name}>
+    <ManufacturerName>תנובה</ManufacturerName>
+    <ManufactureCountry>IL</ManufactureCountry>
+    <Quantity>1.00</Quantity>
+    <UnitOfMeasure>ליטר</UnitOfMeasure>
+    <bIsWeighted>0</bIsWeighted>
+    <ItemPrice>7.10</ItemPrice>
+    <UnitOfMeasurePrice>7.10</UnitOfMeasurePrice>
+  </Item>
+  <Item>
+    <ItemCode>7290000000028</ItemCode>
+    <{name}>לחם אחיד</{name}>
+    <ManufacturerName>תנובה</ManufacturerName>
+    <ItemPrice> </ItemPrice>
+  </Item>
+</Items>'''
+
+PRICE_FILES = {
+    'Root': '<?xml version="1.0" encoding="utf-8"?><Root><ChainId>7290027600007</ChainId>{items}</Root>',
+    'root': '<?xml version="1.0" encoding="utf-8"?><root><ChainID>7290027600007</ChainID>{items}</root>',
+    'asx:abap': ('<?xml version="1.0" encoding="utf-8"?>'
+                 '<asx:abap xmlns:asx="http://www.sap.com/abapxml" version="1.0"><asx:values>'
+                 '<CHAINID>7290027600007</CHAINID>{items}</asx:values></asx:abap>'),
+}
+
+PROMOS = '''<?xml version="1.0" encoding="utf-8"?>
+<Root>
+  <Promotions Count="1">
+    <Promotion>
+      <PromotionId>123</PromotionId>
+      <PromotionDescription>2 ב-10</PromotionDescription>
+      <DiscountedPrice>10.00</DiscountedPrice>
+      <MinQty>2</MinQty>
+      <Clubs><ClubId>0</ClubId></Clubs>
+      <PromotionItems Count="2">
+        <Item><ItemCode>7290000000011</ItemCode><IsGiftItem>0</IsGiftItem></Item>
+        <Item><ItemCode>7290000000028</ItemCode><IsGiftItem>0</IsGiftItem></Item>
+      </PromotionItems>
+      <Unused>dropped</Unused>
+    </Promotion>
+  </Promotions>
+</Root>'''
+
+
+@pytest.mark.parametrize('root', PRICE_FILES)
+@pytest.mark.parametrize('name', ['ItemName', 'ItemNm'])
+def test_price_items_schema_variants(root, name):
+    """ Root / root / asx:abap documents and ItemName / ItemNm give the same projected, typed items """
+    xml = PRICE_FILES[root].format(items=ITEMS.format(name=name)).encode()
+    items = parse_price_items(io.BytesIO(xml))
+    assert items == [
+        {'PriceUpdateDate': '2025-11-08 03:00:00', 'ItemCode': '7290000000011', 'ItemType': '1', name: 'חלב 3%',
+         'ManufacturerName': 'תנובה', 'Quantity': '1.00', 'UnitOfMeasure': 'ליטר', 'bIsWeighted': '0',
+         'ItemPrice': 7.10, 'UnitOfMeasurePrice': 7.10},
+        {'ItemCode': '7290000000028', name: 'לחם אחיד', 'ManufacturerName': 'תנובה', 'ItemPrice': None},
+    ]
+    # Low cardinality values are shared between records
+    assert items[0]['ManufacturerName'] is items[1]['ManufacturerName']
+
+
+def test_promo_items_keep_nested_structure():
+    """ Promotion items inside a promotion are not records, nested fields keep the xmltodict shape """
+    promos = parse_promo_items(io.BytesIO(PROMOS.encode()))
+    assert promos == [{
+        'PromotionId': '123', 'PromotionDescription': '2 ב-10', 'DiscountedPrice': 10.0, 'MinQty': '2',
+        'Clubs': {'ClubId': '0'},
+        'PromotionItems': {'Item': [{'ItemCode': '7290000000011', 'IsGiftItem': '0'},
+                                    {'ItemCode': '7290000000028', 'IsGiftItem': '0'}]},
+    }]
+
+
+def test_price_items_reject_truncated_xml():
+    """ A truncated file is an error, not a silently shorter item list """
+    xml = PRICE_FILES['Root'].format(items=ITEMS.format(name='ItemName')).encode()
+    with pytest.raises(Exception):
+        parse_price_items(io.BytesIO(xml[:len(xml) // 2]))
+
+
+def test_parse_source_gzip_prices():
+    """ parse_source decompresses while parsing """
+    xml = PRICE_FILES['root'].format(items=ITEMS.format(name='ItemNm')).encode()
+    items = parse_source(io.BytesIO(gzip.compress(xml)), 'prices')
+    assert [item['ItemCode'] for item in items] == ['7290000000011', '7290000000028']
+
+
+def test_parse_source_fixes_missing_subchain_close():
+    """ Store files missing </SubChain> before </SubChains> parse with fix_subchain """
+    xml = ('<?xml version="1.0" encoding="utf-8"?><Root><ChainId>7290700100008</ChainId><SubChains>'
+           '<SubChain><SubChainId>1</SubChainId><Stores><Store><StoreId>2</StoreId></Store></Stores>'
+           '</SubChains></Root>').encode()
+    with pytest.raises(Exception):
+        parse_source(io.BytesIO(xml), 'dict')
+    data = parse_source(io.BytesIO(xml), 'dict', fix_subchain=True)
+    assert data['Root']['SubChains']['SubChain']['SubChainId'] == '1'
+    assert data['Root']['SubChains']['SubChain']['Stores']['Store']['StoreId'] == '2'
+
+
+def test_columns_round_trip():
+    """ Records sent back from a worker as columns keep missing fields missing and None values None """
+    xml = PRICE_FILES['Root'].format(items=ITEMS.format(name='ItemName')).encode()
+    items = parse_price_items(io.BytesIO(xml))
+    assert from_columns(pickle.loads(pickle.dumps(to_columns(items)))) == items
+    assert from_columns(to_columns([])) == []
@@ -1,16 +1,23 @@
 import streamlit as st
-from backend.core.super_class import SupermarketChain
+from typing import TYPE_CHECKING
 from backend.services.async_runner import run_async
 from backend.services.db_service import get_stores_for_chain
 from backend.utilities.general import get_chain_from_code
+from backend.core.registry import CHAINS, chain_info
+
+if TYPE_CHECKING:
+    from backend.core.super_class import SupermarketChain
+
+
+def price_text(value) -> str:
+    """ Price with two decimals - prices are parsed as float (text / None shown as is) """
+    return f'{value:.2f}' if isinstance(value, float) else str(value)
 
 
 def chain_selector():
     """ Chain selector dropdown """
-    # Get all registered supermarket chains
-    chains = SupermarketChain.registry
-    # Make dict with chain_code as key and alias as value
-    code_to_alias = {c.chain_code: c.alias for c in chains}
+    # Make dict with chain_code as key and alias as value - registry metadata, no chain modules imported
+    code_to_alias = {c.chain_code: c.alias for c in CHAINS}
     # Sort the chain codes by their alias
     sorted_codes = sorted(code_to_alias.keys(), key=lambda x: code_to_alias[x])
 
@@ -23,7 +30,7 @@ def chain_selector():
         key='chain_selector'
     )
 
-    chain_alias = next(c.alias for c in chains if c.chain_code == chain) if chain else None
+    chain_alias = chain_info(chain).alias if chain else None
     # Return chain_code of selected chain
     return chain, chain_alias
 
@@ -78,7 +85,7 @@ def price_element(item: str, item_details: dict):
         }",
         label_visibility='collapsed',
         value=(
-            f"{item_details[item]['ItemPrice']} NIS"
+            f"{price_text(item_details[item]['ItemPrice'])} NIS"
             if item_details and item_details.get(item)
             else "N/A"
         ),
@@ -87,7 +94,7 @@ def price_element(item: str, item_details: dict):
     st.divider()
 
 
-def promo_element(chain: SupermarketChain, promo: dict):
+def promo_element(chain: 'SupermarketChain', promo: dict):
     """ Renders a single promo element according to reward type"""
     # Dispatcher
     PROMO_RENDERERS = {
@@ -104,22 +111,22 @@ def promo_element(chain: SupermarketChain, promo: dict):
     handler(chain, promo)
 
 
-def render_quantity_discount(chain: SupermarketChain, promo: dict):
+def render_quantity_discount(chain: 'SupermarketChain', promo: dict):
     """ Renders a single promo element with reward type 1"""
     st.markdown(f"**{promo.get('PromotionDescription', 'N/A')}**")
     st.metric(
         label="Promotion Price",
-        value=f"{promo.get('DiscountedPrice', 'N/A')} NIS",
+        value=f"{price_text(promo.get('DiscountedPrice', 'N/A'))} NIS",
     )
     st.write(f"- Minimum Quantity: {promo.get('MinQty', 'N/A')}")
     st.write(f"- Maximum Quantity: {promo.get('MaxQty', 'N/A')}")
-    st.write(f"- Minimum Purchase: {promo.get('MinPurchaseAmnt', 'N/A')}")
+    st.write(f"- Minimum Purchase: {price_text(promo.get('MinPurchaseAmnt', 'N/A'))}")
     st.write(f"- Target Customers: {chain.promo_audience(promo)}")
     st.write(f"- Valid Until: {promo.get('PromotionEndDate', 'N/A')}")
     st.divider()
 
 
-def render_percentage_discount(chain: SupermarketChain, promo: dict):
+def render_percentage_discount(chain: 'SupermarketChain', promo: dict):
     """ Renders a single promo element with reward type 2"""
     st.markdown(f"**{promo.get('PromotionDescription', 'N/A')}**")
     st.metric(
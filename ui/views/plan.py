@@ -1,6 +1,7 @@
 import streamlit as st
 
 from backend.services.async_runner import run_async
+from backend.services.session_state_service import force_values_into_session_state
 from backend.pipelines.fresh_price_promo import planning_data
 from ui.common_elements import chain_selector, store_selector, selected_stores_for_planning
 
@@ -29,7 +30,7 @@ def leading_store():
             with st.spinner('Getting Your Data'):
                 stores_list = st.session_state.get('selected_stores')
                 if stores_list:
-                    run_async(planning_data, stores_list=stores_list)
+                    force_values_into_session_state(run_async(planning_data, stores_list=stores_list))
 
             # if shoppinglist exist, delete
             if 'shoppinglist' in st.session_state:
@@ -3,6 +3,7 @@ import itertools
 import math
 
 from backend.utilities.general import session_code
+from ui.common_elements import price_text
 
 
 def best_cost_for_k_stores(shoppinglist, k):
@@ -199,7 +200,7 @@ def render():
             st.write(f"{item} - {next(d.get('ItemName') or d.get('ItemNm') for d in st.session_state[store_keys[1]] if d['ItemCode'] == item)}")
             for key in store_keys:
                 price = next((d['ItemPrice'] for d in st.session_state[key] if d['ItemCode'] == item), None)
-                st.write(f"{key}: ₪ {price}")
+                st.write(f"{key}: ₪ {price_text(price)}")
             st.divider()
 
 
@@ -1,6 +1,6 @@
 import streamlit as st
 from backend.services.async_runner import run_async
-from backend.services.session_state_service import force_value_into_session_state
+from backend.services.session_state_service import force_value_into_session_state, force_values_into_session_state
 from backend.services.error_service import no_data_error
 from backend.pipelines.fresh_price_promo import shopping_data
 from ui.common_elements import chain_selector, store_selector
@@ -30,7 +30,8 @@ def render():
                 with st.spinner('Loading Data, One Moment.....'):
                     try:
                         # Get price and promo data for selected store and enter into session_state
-                        run_async(shopping_data, chain_code=chain_code, store_code=store_code)
+                        force_values_into_session_state(
+                            run_async(shopping_data, chain_code=chain_code, store_code=store_code))
                         # Go to item details page
                         st.switch_page('ui/views/item.py')
                     # Price_data = None